@@ -0,0 +1,286 @@
+# runs the thread-2 extraction (home_scrape -> mini_links_scrape -> merge) over a list of
+# domains with a bounded number of concurrent companies, saving one CompanyDetails per
+# domain to a CompanyStore.
+#
+#   python batch_runner.py domains.txt --db companies.sqlite --workers 8 --browsers 4
+#
+# With --offline every site is crawled first, all page extractions go out as one LLM
+# batch (see llm_batch.py) and the results are merged per domain once it completes.
+#
+#   python batch_runner.py domains.txt --offline --backend openai --poll 300
+
+import argparse
+import asyncio
+import importlib
+import json
+import math
+import time
+from urllib.parse import urlparse
+
+from browser_pool import CrawlerPool
+from company_store import CompanyStore
+from llm_batch import LocalBatchBackend, OpenAIBatchBackend, batch_line, run_batch_file
+from llm_cache import cache_key
+
+# thread-2.py is not an importable name, so load it by file name.
+extraction = importlib.import_module("thread-2")
+
+STAGES = ("home", "links", "merge")
+OFFLINE_STAGES = ("crawl", "batch", "merge")
+
+
+def read_domains(path):
+    """Returns (domain, url) pairs from a file with one domain or URL per line; # starts a comment."""
+    entries, seen = [], set()
+    with open(path) as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            url = line if "://" in line else f"https://{line}"
+            domain = urlparse(url).netloc.lower()
+            if domain and domain not in seen:
+                seen.add(domain)
+                entries.append((domain, url))
+    return entries
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class BatchStats:
+    def __init__(self, total, stages=STAGES):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.stages = stages
+        self.stage_times = {stage: [] for stage in stages}
+        self.started = time.perf_counter()
+
+    def record(self, ok, timings):
+        if ok:
+            self.done += 1
+        else:
+            self.failed += 1
+        for stage, seconds in timings.items():
+            self.stage_times[stage].append(seconds)
+
+    def rate(self):
+        minutes = (time.perf_counter() - self.started) / 60
+        return (self.done + self.failed) / minutes if minutes else 0.0
+
+    def log(self, domain, outcome):
+        print(f"[{self.done + self.failed}/{self.total}] {domain} {outcome} ({self.rate():.1f} domains/min)")
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        print(
+            f"\n{self.done} done, {self.failed} failed of {self.total} in {elapsed:.0f}s "
+            f"({self.rate():.1f} domains/min)"
+        )
+        for stage in self.stages:
+            times = self.stage_times[stage]
+            if times:
+                print(
+                    f"  {stage:<6} n={len(times):<5} mean {sum(times) / len(times):6.1f}s  "
+                    f"p50 {percentile(times, 0.5):6.1f}s  p95 {percentile(times, 0.95):6.1f}s"
+                )
+
+
+async def run_domain(domain, url, store, stats, timeout):
+    timings = {}
+    try:
+        details = await asyncio.wait_for(extraction.extract_company(url, timings), timeout)
+    except Exception as e:
+        error = "timed out" if isinstance(e, asyncio.TimeoutError) else repr(e)
+        store.save_failed(domain, url, error, timings)
+        stats.record(False, timings)
+        outcome = f"failed: {error}"
+    else:
+        store.save_done(domain, url, details, timings)
+        stats.record(True, timings)
+        outcome = "ok"
+    stats.log(domain, outcome)
+
+
+async def for_each(entries, workers, handle):
+    """Awaits handle(domain, url) for every entry, at most `workers` at a time."""
+    queue = asyncio.Queue()
+    for entry in entries:
+        queue.put_nowait(entry)
+    for _ in range(workers):
+        queue.put_nowait(None)
+
+    async def worker():
+        while True:
+            entry = await queue.get()
+            if entry is None:
+                return
+            await handle(*entry)
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+
+
+async def run_batch(entries, store, workers, timeout):
+    stats = BatchStats(len(entries))
+    try:
+        await for_each(entries, workers, lambda domain, url: run_domain(domain, url, store, stats, timeout))
+    finally:
+        stats.report()
+    return stats
+
+
+async def crawl_all(entries, store, stats, workers, timeout):
+    """Collects every domain's pages; returns {domain: (url, pages, crawl seconds)}."""
+    crawled = {}
+
+    async def crawl(domain, url):
+        started = time.perf_counter()
+        try:
+            pages = await asyncio.wait_for(extraction.collect_pages(url), timeout)
+        except Exception as e:
+            error = "timed out" if isinstance(e, asyncio.TimeoutError) else repr(e)
+            timings = {"crawl": time.perf_counter() - started}
+            store.save_failed(domain, url, error, timings)
+            stats.record(False, timings)
+            stats.log(domain, f"failed: {error}")
+        else:
+            crawled[domain] = (url, pages, time.perf_counter() - started)
+
+    await for_each(entries, workers, crawl)
+    return crawled
+
+
+def write_requests(crawled, path):
+    """
+    Writes one extraction request per page to the batch file, skipping pages whose
+    response is already in the LLM cache. Returns (requests, answers): the request
+    for every page by custom_id, and the cached answers.
+    """
+    requests, answers = {}, {}
+    with open(path, "w") as f:
+        for domain, (url, pages, _) in crawled.items():
+            for index, page in enumerate(pages):
+                custom_id = f"{domain}#{index}"
+                # Same temperatures as home_scrape (home page) and extract_link.
+                known, request = extraction.extraction_request(page, temperature=0.8 if index == 0 else 0.9)
+                key = cache_key(**request)
+                requests[custom_id] = (known, request, key)
+                cached = extraction.llm_cache.lookup(key)
+                if cached is not None:
+                    answers[custom_id] = cached
+                else:
+                    f.write(json.dumps(batch_line(custom_id, **request)) + "\n")
+    return requests, answers
+
+
+async def run_offline(entries, store, args):
+    stats = BatchStats(len(entries), stages=OFFLINE_STAGES)
+    crawled = await crawl_all(entries, store, stats, args.workers, args.timeout)
+    requests, answers = write_requests(crawled, args.batch_file)
+    submitted = len(requests) - len(answers)
+    print(
+        f"Crawled {len(crawled)} domain(s): {len(requests)} page(s), {len(answers)} answered "
+        f"from the LLM cache, {submitted} written to {args.batch_file}"
+    )
+
+    usage = {"prompt_tokens": 0, "completion_tokens": 0}
+    started = time.perf_counter()
+    if submitted:
+        backend = (
+            OpenAIBatchBackend(extraction.client) if args.backend == "openai" else LocalBatchBackend()
+        )
+        results = await asyncio.to_thread(run_batch_file, backend, args.batch_file, args.poll)
+        for custom_id, (content, used) in results.items():
+            _, request, key = requests[custom_id]
+            extraction.llm_cache.put(key, request["model"], content)
+            answers[custom_id] = content
+            for name in usage:
+                usage[name] += used.get(name, 0)
+    batch_seconds = time.perf_counter() - started
+
+    # Join the answers back to their domains and pages, in page order.
+    for domain, (url, pages, crawl_seconds) in crawled.items():
+        started = time.perf_counter()
+        records = []
+        for index in range(len(pages)):
+            custom_id = f"{domain}#{index}"
+            if custom_id not in answers:
+                continue
+            known, request, _ = requests[custom_id]
+            try:
+                details = request["response_format"].model_validate_json(answers[custom_id])
+            except ValueError:
+                continue
+            records.append(extraction.complete_details(details.model_dump(), known))
+        timings = {"crawl": crawl_seconds, "batch": batch_seconds}
+        if records:
+            details = await extraction.merge_details(records, resolve=False)
+            timings["merge"] = time.perf_counter() - started
+            store.save_done(domain, url, details, timings)
+            stats.record(True, timings)
+            stats.log(domain, f"ok ({len(records)}/{len(pages)} page(s))")
+        else:
+            store.save_failed(domain, url, "no extraction results", timings)
+            stats.record(False, timings)
+            stats.log(domain, "failed: no extraction results")
+
+    stats.report()
+    tokens = usage["prompt_tokens"] + usage["completion_tokens"]
+    print(
+        f"Batch usage: {usage['prompt_tokens']} prompt + {usage['completion_tokens']} completion tokens"
+        + (f", {tokens / stats.done:.0f} tokens per company" if stats.done else "")
+    )
+    return stats
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Extract CompanyDetails for a list of domains.")
+    parser.add_argument("domains", help="file with one domain or URL per line")
+    parser.add_argument("--db", default="companies.sqlite", help="results store")
+    parser.add_argument("--workers", type=int, default=8, help="companies extracted at once")
+    parser.add_argument("--browsers", type=int, default=4, help="warm browsers shared by the workers")
+    parser.add_argument("--timeout", type=float, default=600, help="seconds allowed per domain")
+    parser.add_argument("--retry-failed", action="store_true", help="redo domains that failed before")
+    parser.add_argument("--offline", action="store_true", help="extract through one LLM batch")
+    parser.add_argument("--batch-file", default="batch_requests.jsonl", help="requests written in --offline mode")
+    parser.add_argument(
+        "--backend",
+        choices=("openai", "local"),
+        default="openai",
+        help="batch backend; 'local' answers from files, for testing",
+    )
+    parser.add_argument("--poll", type=float, default=60, help="seconds between batch status checks")
+    args = parser.parse_args()
+
+    store = CompanyStore(args.db)
+    entries = read_domains(args.domains)
+    skip = store.domains("done") if args.retry_failed else store.domains("done", "failed")
+    todo = [entry for entry in entries if entry[0] not in skip]
+    print(f"{len(entries)} domain(s), {len(entries) - len(todo)} already in {args.db}, {len(todo)} to extract")
+
+    # thread-2 leases from its module-level pool; give it one sized for this run. The
+    # default pool it replaces launches browsers lazily, so it never started any.
+    extraction.crawler_pool = CrawlerPool(size=args.browsers, max_pages=200)
+    try:
+        if args.offline:
+            await run_offline(todo, store, args)
+        else:
+            await run_batch(todo, store, args.workers, args.timeout)
+    finally:
+        extraction.page_cache.report()
+        extraction.context_budget.report()
+        extraction.llm_cache.report()
+        extraction.contact_extractor.report()
+        extraction.doc_ingestor.report()
+        extraction.crawler_pool.report()
+        await extraction.crawler_pool.close()
+        extraction.doc_ingestor.close()
+        print(f"Results in {args.db}: {store.summary()}")
+        store.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+# compares the local link ranker with the LLM's MeaningFullLinks picks on fixtures saved
+# by thread-2 (run it with LINK_FIXTURES_PATH set to record them).
+#
+#   python bench_link_ranker.py link_fixtures.jsonl --limit 5
+
+import argparse
+import json
+import time
+
+from link_ranker import canonical_link, select_links
+
+
+def overlap(ours, theirs):
+    ours = {canonical_link(href) for href in ours}
+    theirs = {canonical_link(href) for href in theirs}
+    hits = len(ours & theirs)
+    precision = hits / len(ours) if ours else float(not theirs)
+    recall = hits / len(theirs) if theirs else 1.0
+    return precision, recall
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score the link ranker against saved LLM picks.")
+    parser.add_argument("fixtures", help="JSONL written by thread-2 with LINK_FIXTURES_PATH set")
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--min-confidence", type=float, default=0.6)
+    args = parser.parse_args()
+
+    with open(args.fixtures) as f:
+        fixtures = [json.loads(line) for line in f if line.strip()]
+    if not fixtures:
+        print("No fixtures")
+        return
+
+    totals = {"web_p": 0.0, "web_r": 0.0, "doc_p": 0.0, "doc_r": 0.0, "fallback": 0, "seconds": 0.0}
+    for fixture in fixtures:
+        started = time.perf_counter()
+        picks, confidence = select_links(fixture["links"], base_url=fixture["url"], limit=args.limit)
+        totals["seconds"] += time.perf_counter() - started
+        web_p, web_r = overlap(picks["web_urls"], fixture["llm"]["web_urls"])
+        doc_p, doc_r = overlap(picks["doc_urls"], fixture["llm"]["doc_urls"])
+        totals["web_p"] += web_p
+        totals["web_r"] += web_r
+        totals["doc_p"] += doc_p
+        totals["doc_r"] += doc_r
+        totals["fallback"] += confidence < args.min_confidence
+        print(f"{fixture['url']:<40} web p {web_p:4.0%} r {web_r:4.0%}  confidence {confidence:.2f}")
+
+    n = len(fixtures)
+    print(
+        f"\n{n} fixture(s): web precision {totals['web_p'] / n:.0%}, recall {totals['web_r'] / n:.0%}; "
+        f"doc precision {totals['doc_p'] / n:.0%}, recall {totals['doc_r'] / n:.0%}"
+    )
+    print(
+        f"LLM fallback on {totals['fallback']} ({totals['fallback'] / n:.0%}), "
+        f"{1000 * totals['seconds'] / n:.2f} ms per site"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# process-wide pool of warm crawl4ai crawlers, so company extractions lease an already
+# running browser instead of launching chromium for every home/sub-page scrape.
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from crawl4ai import AsyncWebCrawler, BrowserConfig, CacheMode, CrawlerRunConfig
+
+HEALTH_CHECK_CONFIG = CrawlerRunConfig(cache_mode=CacheMode.BYPASS)
+
+
+class _Slot:
+    def __init__(self):
+        self.crawler = None
+        self.pages = 0
+        self.checked_at = 0.0
+        self.broken = False
+        self.leased = False
+        # Set by close() on a slot that is leased out; its browser closes on release.
+        self.closed = False
+
+
+class PooledCrawler:
+    """A leased crawler; counts pages so the pool knows when to recycle the browser."""
+
+    def __init__(self, slot):
+        self._slot = slot
+
+    async def arun(self, url, config=None, **kwargs):
+        self._slot.pages += 1
+        return await self._slot.crawler.arun(url=url, config=config, **kwargs)
+
+
+class CrawlerPool:
+    """
+    Keeps `size` AsyncWebCrawler instances started and hands them out with lease().
+
+    Browsers launch lazily on first lease. A browser is relaunched after max_pages
+    pages, after a lease that raised, or when a health check (rendering a raw HTML
+    snippet, run at most every health_interval seconds) fails. close() shuts the
+    idle browsers down at once and leased ones as soon as their lease ends.
+    """
+
+    def __init__(self, size=2, browser_config=None, max_pages=200, health_interval=60):
+        self.size = size
+        self.browser_config = browser_config or BrowserConfig(headless=True)
+        self.max_pages = max_pages
+        self.health_interval = health_interval
+        self.stats = {"launches": 0, "recycles": 0, "leases": 0, "failed_checks": 0}
+        self._slots = None
+        # Every slot handed out by this pool, leased or idle, so close() reaches them all.
+        self._all_slots = []
+
+    def _queue(self):
+        if self._slots is None:
+            self._slots = asyncio.Queue()
+            for _ in range(self.size):
+                slot = _Slot()
+                self._all_slots.append(slot)
+                self._slots.put_nowait(slot)
+        return self._slots
+
+    async def _launch(self, slot):
+        slot.crawler = await AsyncWebCrawler(config=self.browser_config).start()
+        slot.pages = 0
+        slot.checked_at = time.monotonic()
+        slot.broken = False
+        self.stats["launches"] += 1
+
+    async def _retire(self, slot):
+        crawler, slot.crawler = slot.crawler, None
+        if crawler is not None:
+            try:
+                await crawler.close()
+            except Exception:
+                pass
+
+    async def _healthy(self, slot):
+        try:
+            result = await slot.crawler.arun(url="raw:<html><body>ok</body></html>", config=HEALTH_CHECK_CONFIG)
+            return result.success
+        except Exception:
+            return False
+
+    async def _ready(self, slot):
+        if slot.crawler is not None and (slot.broken or slot.pages >= self.max_pages):
+            self.stats["recycles"] += 1
+            await self._retire(slot)
+        elif slot.crawler is not None and time.monotonic() - slot.checked_at > self.health_interval:
+            if await self._healthy(slot):
+                slot.checked_at = time.monotonic()
+            else:
+                self.stats["failed_checks"] += 1
+                await self._retire(slot)
+        if slot.crawler is None:
+            await self._launch(slot)
+
+    @asynccontextmanager
+    async def lease(self):
+        """Waits for a free crawler and yields it; it goes back to the pool on exit."""
+        queue = self._queue()
+        slot = await queue.get()
+        slot.leased = True
+        try:
+            await self._ready(slot)
+            self.stats["leases"] += 1
+            yield PooledCrawler(slot)
+        except BaseException:
+            slot.broken = True
+            raise
+        finally:
+            slot.leased = False
+            if slot.closed:
+                await self._retire(slot)
+            else:
+                queue.put_nowait(slot)
+
+    async def close(self):
+        if self._slots is None:
+            return
+        for slot in self._all_slots:
+            slot.closed = True
+            if not slot.leased:
+                await self._retire(slot)
+        self._slots = None
+        self._all_slots = []
+
+    def report(self):
+        print(
+            f"Crawler pool: {self.stats['leases']} lease(s), {self.stats['launches']} browser launch(es), "
+            f"{self.stats['recycles']} recycle(s), {self.stats['failed_checks']} failed health check(s)"
+        )
+
+
+_default_pool = None
+
+
+def get_pool(size=2, browser_config=None, max_pages=200):
+    """Returns the process-wide pool, creating it with these settings on first call."""
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = CrawlerPool(size=size, browser_config=browser_config, max_pages=max_pages)
+    return _default_pool
@@ -0,0 +1,71 @@
+# sqlite results store for batch company extraction: one CompanyDetails row per domain,
+# so a long batch can be resumed and queried while it runs.
+
+import json
+import sqlite3
+import threading
+import time
+
+
+class CompanyStore:
+    """
+    Holds the outcome of every domain in a batch: status ("done" or "failed"), the
+    extracted CompanyDetails as JSON, the error for failures and the seconds spent
+    in each pipeline stage. Each result is committed as soon as it is saved.
+    """
+
+    def __init__(self, path="companies.sqlite"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS companies (
+                domain TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status TEXT NOT NULL,
+                details TEXT,
+                error TEXT,
+                timings TEXT,
+                updated_at REAL NOT NULL
+            )"""
+        )
+        self._db.commit()
+
+    def domains(self, *statuses):
+        """Returns the domains whose last result has one of the given statuses."""
+        with self._lock:
+            return {
+                domain
+                for (domain,) in self._db.execute(
+                    f"SELECT domain FROM companies WHERE status IN ({', '.join('?' * len(statuses))})",
+                    statuses,
+                )
+            }
+
+    def _save(self, domain, url, status, details, error, timings):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO companies VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    domain,
+                    url,
+                    status,
+                    json.dumps(details) if details is not None else None,
+                    error,
+                    json.dumps(timings),
+                    time.time(),
+                ),
+            )
+
+    def save_done(self, domain, url, details, timings):
+        self._save(domain, url, "done", details, None, timings)
+
+    def save_failed(self, domain, url, error, timings):
+        self._save(domain, url, "failed", None, error, timings)
+
+    def summary(self):
+        with self._lock:
+            return dict(self._db.execute("SELECT status, COUNT(*) FROM companies GROUP BY status"))
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,187 @@
+# pulls the pattern-shaped CompanyDetails fields (email, phone numbers, address,
+# brochure link) out of a page locally, so the LLM is only asked for the rest.
+
+import re
+
+CONTACT_FIELDS = ("email_id", "mobile_number", "general_contact_number", "address", "product_brochure")
+
+MAILTO_RE = re.compile(r"\(mailto:([^)?\s]+)", re.IGNORECASE)
+TEL_RE = re.compile(r"\(tel:([^)\s]+)", re.IGNORECASE)
+EMAIL_RE = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}\b")
+PHONE_RE = re.compile(r"(?<![\w/])(?:\+\d{1,3}[\s.-]?)?(?:\(?\d{2,5}\)?[\s.-]?)?\d{3,5}[\s.-]?\d{3,5}(?![\w/])")
+MOBILE_LABEL_RE = re.compile(r"\b(?:mobile|mob|cell|whatsapp)\b", re.IGNORECASE)
+PHONE_LABEL_RE = re.compile(r"\b(?:phone|ph|tel|telephone|call|contact no|mobile|mob|cell|whatsapp)\b", re.IGNORECASE)
+# Written like a phone number: a +country code, a (area code), or a 0 trunk prefix
+# followed by a separator. A bare run of digits ("1500000000 users") is not.
+PHONE_STYLE_RE = re.compile(r"^(?:\+\d|\(\d|0\d+[\s.-])")
+ADDRESS_LABEL_RE = re.compile(
+    r"^\W*(?:address|registered office|head office|corporate office|headquarters|hq)\b\W*",
+    re.IGNORECASE,
+)
+PIN_RE = re.compile(r"\b\d{3}\s?\d{3}\b|\b\d{5}(?:-\d{4})?\b")
+# A line that is only markdown images or links (a logo, "Get directions").
+MEDIA_LINE_RE = re.compile(r"^(?:!?\[[^\]]*\]\([^)]*\)\s*)+$")
+PDF_LINK_RE = re.compile(r"\[([^\]]*)\]\((\S+?\.pdf)(?:\s[^)]*)?\)", re.IGNORECASE)
+BROCHURE_WORDS = ("brochure", "catalog", "catalogue", "datasheet", "profile")
+# Image and asset names that look like e-mail addresses (logo@2x.png).
+ASSET_SUFFIXES = (".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp")
+
+
+def _digits(number):
+    return re.sub(r"\D", "", number)
+
+
+def is_mobile(number):
+    """
+    Indian mobile numbers: 10 digits starting 6-9, optionally after 91. A leading 0 is
+    not stripped, since "080 4123 4567" style landlines would then look like mobiles.
+    Landlines written with the country code ("+91 80 4123 4567") also have 10 digits
+    starting 6-9 when the area code does, so a number whose first group after 91 is a
+    2-4 digit area code is a landline; mobiles are written as one block or 5 + 5.
+    """
+    groups = re.findall(r"\d+", number)
+    digits = "".join(groups)
+    if len(digits) == 12 and digits.startswith("91"):
+        digits = digits[2:]
+        groups = groups[1:] if groups[0] == "91" else [groups[0][2:], *groups[1:]]
+    if len(digits) != 10 or digits[0] not in "6789":
+        return False
+    return not (groups and 2 <= len(groups[0]) <= 4)
+
+
+def _jsonld_nodes(blocks):
+    stack = list(blocks)
+    while stack:
+        node = stack.pop(0)
+        if isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, dict):
+            yield node
+            stack.extend(value for value in node.values() if isinstance(value, (dict, list)))
+
+
+def _format_address(address):
+    if isinstance(address, str):
+        return address.strip()
+    if isinstance(address, dict):
+        parts = (
+            address.get(key)
+            for key in ("streetAddress", "addressLocality", "addressRegion", "postalCode", "addressCountry")
+        )
+        return ", ".join(
+            part.get("name", "") if isinstance(part, dict) else str(part) for part in parts if part
+        )
+    return ""
+
+
+def _first(value):
+    """The first item of a JSON-LD list value ("telephone": ["+91 ..."]), else the value."""
+    if isinstance(value, list):
+        return value[0] if value else None
+    return value
+
+
+def from_jsonld(blocks):
+    """Reads email, telephone and address from schema.org Organization-like nodes."""
+    found = {}
+    for node in _jsonld_nodes(blocks):
+        email = _first(node.get("email"))
+        if email and "email_id" not in found:
+            found["email_id"] = str(email).removeprefix("mailto:")
+        telephone = _first(node.get("telephone"))
+        if telephone:
+            field = "mobile_number" if is_mobile(str(telephone)) else "general_contact_number"
+            found.setdefault(field, str(telephone).strip())
+        if node.get("address") and "address" not in found:
+            address = _format_address(node["address"])
+            if address:
+                found["address"] = address
+    return found
+
+
+def _emails(markdown):
+    emails = MAILTO_RE.findall(markdown) + EMAIL_RE.findall(markdown)
+    return [email for email in emails if not email.lower().endswith(ASSET_SUFFIXES)]
+
+
+def _phones(markdown):
+    """
+    Yields (number, labelled_mobile) for tel: links first, then numbers in the text
+    that are on a phone-labelled line or written like a phone number.
+    """
+    for number in TEL_RE.findall(markdown):
+        yield number, False
+    for line in markdown.splitlines():
+        labelled = bool(PHONE_LABEL_RE.search(line))
+        for match in PHONE_RE.finditer(line):
+            number = match.group().strip()
+            if not 10 <= len(_digits(number)) <= 13:
+                continue
+            if labelled or PHONE_STYLE_RE.match(number):
+                yield number, bool(MOBILE_LABEL_RE.search(line))
+
+
+def _address(markdown):
+    lines = [line.strip() for line in markdown.splitlines()]
+    for i, line in enumerate(lines):
+        if not ADDRESS_LABEL_RE.match(line):
+            continue
+        value = ADDRESS_LABEL_RE.sub("", line).strip()
+        # "Address:" on a line of its own is followed by the address lines.
+        following = []
+        for next_line in lines[i + 1 :]:
+            if not next_line or next_line.startswith("#") or len(following) == 3:
+                break
+            if not MEDIA_LINE_RE.match(next_line):
+                following.append(next_line)
+        value = ", ".join(part for part in [value, *following] if part)
+        if PIN_RE.search(value) or len(value.split()) >= 4:
+            return value.strip(" ,")
+    return ""
+
+
+def _brochure(markdown):
+    pdfs = PDF_LINK_RE.findall(markdown)
+    for text, href in pdfs:
+        if any(word in f"{text} {href}".lower() for word in BROCHURE_WORDS):
+            return href
+    return ""
+
+
+class ContactExtractor:
+    """
+    Fills CONTACT_FIELDS from a page's JSON-LD blocks, mailto:/tel: links and
+    text patterns. Only fields it is confident about are returned; everything
+    else is left for the LLM.
+    """
+
+    def __init__(self):
+        self.stats = {"pages": 0, "fields": 0}
+
+    def extract(self, markdown, jsonld=()):
+        markdown = markdown or ""
+        found = from_jsonld(jsonld)
+
+        emails = _emails(markdown)
+        if emails:
+            found.setdefault("email_id", emails[0])
+        for number, labelled_mobile in _phones(markdown):
+            field = "mobile_number" if labelled_mobile or is_mobile(number) else "general_contact_number"
+            found.setdefault(field, number)
+        address = _address(markdown)
+        if address:
+            found.setdefault("address", address)
+        brochure = _brochure(markdown)
+        if brochure:
+            found["product_brochure"] = brochure
+
+        self.stats["pages"] += 1
+        self.stats["fields"] += len(found)
+        return found
+
+    def report(self):
+        pages = self.stats["pages"]
+        print(
+            f"Contact pre-extraction: {self.stats['fields']} of {pages * len(CONTACT_FIELDS)} "
+            f"contact field(s) filled locally over {pages} page(s)"
+        )
@@ -0,0 +1,150 @@
+# trims scraped page markdown to a token budget before it is sent for extraction, keeping
+# the sections most likely to fill CompanyDetails fields.
+
+import math
+import os
+import re
+
+import tiktoken
+
+DEFAULT_TOKEN_BUDGET = int(os.getenv("CRAWL_TOKEN_BUDGET", "2000"))
+
+# Words that suggest a section holds one of the CompanyDetails fields. A section scores
+# one point per field it touches, so a contact block beats a paragraph repeating "products".
+FIELD_KEYWORDS = {
+    "company_name": ("about us", "who we are", "pvt", "ltd", "limited", "inc.", "llp"),
+    "email_id": ("email", "e-mail", "mail us"),
+    "general_contact_number": ("phone", "mobile", "tel:", "telephone", "call us", "contact"),
+    "address": ("address", "headquarter", "head office", "registered office", "street", "road"),
+    "locations_offices": ("office", "branch", "locations", "presence"),
+    "categories": ("services", "solutions", "what we do", "expertise", "capabilities"),
+    "products": ("product", "platform", "software", "suite"),
+    "industry_types": ("industries", "industry", "sectors", "verticals", "domains"),
+    "number_of_years": ("founded", "established", "since", "years of experience", "incorporated"),
+    "number_of_customers": ("customers", "happy clients", "projects delivered"),
+    "number_of_employees": ("employees", "team of", "professionals", "engineers", "headcount"),
+    "customer_names": ("our clients", "clients", "trusted by", "customers include"),
+    "case_studies": ("case study", "case studies", "success story", "success stories"),
+    "product_brochure": ("brochure", "datasheet", "download", ".pdf"),
+    "client_testimonials": ("testimonial", "what our clients say", "review"),
+    "OEMs": ("oem", "partner", "authorized", "certified", "reseller", "alliances"),
+    "company_profile": ("about", "mission", "vision", "overview", "profile"),
+    "management_details": ("ceo", "cto", "founder", "director", "management", "leadership", "board"),
+    "google_rating": ("rating", "stars", "google"),
+}
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+PHONE_RE = re.compile(r"(?:\+?\d[\d\s().-]{7,}\d)")
+YEAR_RE = re.compile(r"\b(?:19|20)\d{2}\b")
+LINK_RE = re.compile(r"!?\[[^\]]*\]\([^)]*\)")
+HEADING_RE = re.compile(r"^#{1,6}\s")
+# Keywords match at the start of a word, so "product" also finds "products".
+FIELD_PATTERNS = [
+    re.compile(r"\b(?:" + "|".join(map(re.escape, keywords)) + ")", re.IGNORECASE)
+    for keywords in FIELD_KEYWORDS.values()
+]
+
+_encodings = {}
+
+
+def get_encoding(model):
+    if model not in _encodings:
+        try:
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encodings[model] = tiktoken.get_encoding("o200k_base")
+    return _encodings[model]
+
+
+def split_sections(markdown):
+    """
+    Splits markdown into paragraphs, each paired with the heading it sits under so
+    that a paragraph below "## Contact Us" is scored as contact information.
+    """
+    sections, heading = [], ""
+    for block in re.split(r"\n\s*\n", markdown):
+        block = block.strip()
+        if not block:
+            continue
+        first_line = block.split("\n", 1)[0]
+        if HEADING_RE.match(first_line):
+            heading = first_line.lstrip("#").strip()
+        sections.append((heading, block))
+    return sections
+
+
+def score_section(heading, text):
+    labelled = f"{heading}\n{text}"
+    score = sum(1 for pattern in FIELD_PATTERNS if pattern.search(labelled))
+    score += 3 * bool(EMAIL_RE.search(text)) + 2 * bool(PHONE_RE.search(text))
+    score += bool(YEAR_RE.search(text))
+    # Menus and footers are mostly links: keep them only if nothing better fits.
+    link_chars = sum(len(link) for link in LINK_RE.findall(text))
+    if link_chars > 0.6 * len(text):
+        score *= 0.25
+    return score
+
+
+class ContextBudget:
+    """
+    Compresses page markdown to at most `budget` tokens of the given model's encoding.
+
+    Paragraphs are ranked by relevance to the CompanyDetails fields per token, repeated
+    paragraphs (headers and footers) are dropped, and the best ones that fit are kept in
+    their original order. Text already under budget is passed through unchanged.
+    """
+
+    def __init__(self, budget=DEFAULT_TOKEN_BUDGET, model="gpt-4o"):
+        self.budget = budget
+        self.encoding = get_encoding(model)
+        self.stats = {"pages": 0, "trimmed": 0, "tokens_before": 0, "tokens_after": 0}
+
+    def count(self, text):
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def _truncate(self, text, tokens):
+        return self.encoding.decode(self.encoding.encode(text, disallowed_special=())[:tokens])
+
+    def compress(self, markdown, budget=None):
+        """Compresses markdown to `budget` tokens, or to the instance's budget when None."""
+        budget = budget or self.budget
+        markdown = markdown or ""
+        before = self.count(markdown)
+        if before <= budget:
+            compressed, after = markdown, before
+        else:
+            compressed = self._select(markdown, budget)
+            after = self.count(compressed)
+            self.stats["trimmed"] += 1
+        self.stats["pages"] += 1
+        self.stats["tokens_before"] += before
+        self.stats["tokens_after"] += after
+        return compressed
+
+    def _select(self, markdown, budget):
+        candidates, seen = [], set()
+        for position, (heading, text) in enumerate(split_sections(markdown)):
+            if text in seen:
+                continue
+            seen.add(text)
+            tokens = self.count(text) + 1
+            score = score_section(heading, text) + (1 if position == 0 else 0)
+            candidates.append((score / math.sqrt(tokens), position, text, tokens))
+
+        kept, used = [], 0
+        for _, position, text, tokens in sorted(candidates, key=lambda c: (-c[0], c[1])):
+            if used + tokens <= budget:
+                kept.append((position, text))
+                used += tokens
+        if not kept:
+            # A single paragraph larger than the whole budget: keep its head.
+            return self._truncate(markdown, budget)
+        return "\n\n".join(text for _, text in sorted(kept))
+
+    def report(self):
+        before, after = self.stats["tokens_before"], self.stats["tokens_after"]
+        saved = 1 - after / before if before else 0.0
+        print(
+            f"Context budget ({self.budget} tokens/page): {self.stats['pages']} page(s), "
+            f"{self.stats['trimmed']} trimmed, {before} -> {after} tokens ({saved:.0%} saved)"
+        )
@@ -0,0 +1,206 @@
+# downloads the documents picked into MeaningFullLinks.doc_urls (pdf, docx, txt) and turns
+# them into text for the CompanyDetails extraction, without holding a whole file in memory.
+
+import asyncio
+import concurrent.futures
+import os
+import tempfile
+import zipfile
+from urllib.parse import urlparse
+from xml.etree import ElementTree
+
+import httpx
+
+EXTENSIONS = {".pdf": "pdf", ".docx": "docx", ".txt": "txt"}
+CONTENT_TYPES = {
+    "application/pdf": "pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": "docx",
+    "text/plain": "txt",
+}
+WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+# docx and txt have no real pages; text is cut into pages of about this many characters.
+CHARS_PER_PAGE = 3000
+
+
+def doc_kind(url, content_type=""):
+    kind = CONTENT_TYPES.get(content_type.split(";", 1)[0].strip().lower())
+    if kind:
+        return kind
+    return EXTENSIONS.get(os.path.splitext(urlparse(url).path.lower())[1])
+
+
+# Reader functions: each runs on a pool thread and opens the file itself.
+
+
+# PdfReader is handed an open file rather than the path: given a path it reads the
+# whole file into memory, given a file it seeks to the objects it needs.
+
+
+def pdf_pages(path, max_pages):
+    """Yields the text of up to max_pages pages, in order, from a single PdfReader."""
+    from pypdf import PdfReader
+
+    with open(path, "rb") as f:
+        reader = PdfReader(f)
+        for i in range(min(len(reader.pages), max_pages)):
+            yield reader.pages[i].extract_text() or ""
+
+
+def _paginate(chunks, max_pages):
+    pages, current = [], []
+    size = 0
+    for chunk in chunks:
+        current.append(chunk)
+        size += len(chunk)
+        if size >= CHARS_PER_PAGE:
+            pages.append("\n".join(current))
+            current, size = [], 0
+            if len(pages) >= max_pages:
+                return pages
+    if current:
+        pages.append("\n".join(current))
+    return pages
+
+
+def docx_pages(path, max_pages):
+    """Paragraph text of word/document.xml, parsed incrementally straight from the zip."""
+
+    def paragraphs():
+        with zipfile.ZipFile(path) as archive, archive.open("word/document.xml") as document:
+            for _, element in ElementTree.iterparse(document):
+                if element.tag == f"{WORD_NS}p":
+                    text = "".join(node.text or "" for node in element.iter(f"{WORD_NS}t"))
+                    element.clear()
+                    if text.strip():
+                        yield text
+
+    return _paginate(paragraphs(), max_pages)
+
+
+def txt_pages(path, max_pages):
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return _paginate((line.rstrip("\n") for line in f), max_pages)
+
+
+class DocIngestor:
+    """
+    Streams a document to a temporary file (refusing anything over max_bytes), then
+    extracts its text on a worker thread, one document per thread. Reading stops at
+    max_pages pages or once max_tokens tokens have been collected, whichever comes
+    first, so the pages after that are never parsed.
+
+    Threads rather than processes: a "spawn" pool re-runs the calling script
+    (thread-2, batch_runner) in every worker, re-creating its OpenAI clients and
+    caches, and max_pages keeps the parsing work per document small.
+
+    count_tokens(text) measures the text; by default it is estimated as characters / 4.
+    """
+
+    def __init__(
+        self,
+        max_pages=30,
+        max_tokens=8000,
+        max_bytes=100 * 1024 * 1024,
+        workers=None,
+        count_tokens=None,
+        timeout=60,
+    ):
+        self.max_pages = max_pages
+        self.max_tokens = max_tokens
+        self.max_bytes = max_bytes
+        self.workers = workers or os.cpu_count() or 1
+        self.count_tokens = count_tokens or (lambda text: len(text) // 4)
+        self.timeout = timeout
+        self.stats = {"docs": 0, "pages": 0, "bytes": 0, "capped": 0, "failed": 0}
+        self._pool = None
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            self._pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="doc_ingest"
+            )
+        return self._pool
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.pool, fn, *args)
+
+    async def download(self, url):
+        """Streams url to a temporary file; returns (path, kind), or (None, None) if unusable."""
+        async with httpx.AsyncClient(follow_redirects=True, timeout=self.timeout) as client:
+            async with client.stream("GET", url) as response:
+                response.raise_for_status()
+                kind = doc_kind(url, response.headers.get("content-type", ""))
+                length = int(response.headers.get("content-length") or 0)
+                if kind is None or length > self.max_bytes:
+                    return None, None
+                fd, path = tempfile.mkstemp(suffix=f".{kind}")
+                size = 0
+                try:
+                    with os.fdopen(fd, "wb") as f:
+                        async for chunk in response.aiter_bytes(64 * 1024):
+                            size += len(chunk)
+                            if size > self.max_bytes:
+                                raise ValueError(f"larger than {self.max_bytes} bytes")
+                            f.write(chunk)
+                except BaseException:
+                    os.unlink(path)
+                    raise
+        self.stats["bytes"] += size
+        return path, kind
+
+    def _within_tokens(self, pages):
+        """Takes pages until max_tokens is reached; returns (pages, capped)."""
+        kept, tokens = [], 0
+        for text in pages:
+            kept.append(text)
+            tokens += self.count_tokens(text)
+            if tokens >= self.max_tokens:
+                return kept, True
+        return kept, False
+
+    def _read_pages(self, path, kind):
+        pages = {"pdf": pdf_pages, "docx": docx_pages}.get(kind, txt_pages)(path, self.max_pages)
+        return self._within_tokens(pages)
+
+    async def ingest(self, url):
+        """Returns the text of the document at url, or None if it cannot be read."""
+        try:
+            path, kind = await self.download(url)
+        except (httpx.HTTPError, ValueError) as e:
+            print(f"Skipping document {url}: {e}")
+            self.stats["failed"] += 1
+            return None
+        if path is None:
+            print(f"Skipping document {url}: not a pdf/docx/txt or larger than {self.max_bytes} bytes")
+            self.stats["failed"] += 1
+            return None
+        try:
+            text = await self.read(path, kind)
+        except Exception as e:
+            print(f"Skipping document {url}: {e!r}")
+            self.stats["failed"] += 1
+            return None
+        finally:
+            os.unlink(path)
+        return text
+
+    async def read(self, path, kind):
+        """Returns the text of a local pdf, docx or txt file, within max_pages and max_tokens."""
+        pages, capped = await self._run(self._read_pages, path, kind)
+        self.stats["docs"] += 1
+        self.stats["capped"] += capped
+        self.stats["pages"] += len(pages)
+        return "\n\n".join(text.strip() for text in pages if text.strip())
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def report(self):
+        print(
+            f"Documents: {self.stats['docs']} read ({self.stats['pages']} page(s), "
+            f"{self.stats['bytes'] / 1e6:.1f} MB), {self.stats['capped']} capped, "
+            f"{self.stats['failed']} skipped"
+        )
@@ -0,0 +1,129 @@
+# picks the sub-pages worth crawling for CompanyDetails from a site's internal links
+# locally, in place of asking the LLM for MeaningFullLinks on every company.
+
+import json
+import re
+from urllib.parse import urldefrag, urlparse
+
+from doc_ingest import EXTENSIONS
+
+# Only the documents doc_ingest can read; other files are skipped rather than crawled.
+DOC_EXTENSIONS = tuple(EXTENSIONS)
+OTHER_FILES = (
+    ".doc", ".ppt", ".pptx", ".xls", ".xlsx", ".csv", ".zip", ".rar", ".exe", ".dmg",
+    ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".mp3", ".mp4",
+)
+
+# Topic -> (weight, words looked for in the URL path and the anchor text).
+TOPICS = {
+    "about": (3.0, ("about", "who-we-are", "company", "overview", "profile", "story")),
+    "contact": (3.0, ("contact", "reach-us", "locations", "office", "get-in-touch")),
+    "offerings": (2.5, ("services", "solutions", "products", "offerings", "what-we-do", "platform")),
+    "team": (2.0, ("team", "leadership", "management", "people", "founders", "board")),
+    "clients": (2.0, ("clients", "customers", "portfolio", "our-work")),
+    "case_studies": (2.0, ("case-stud", "success-stor", "casestud")),
+    "industries": (1.5, ("industries", "industry", "sectors", "verticals")),
+    "partners": (1.5, ("partners", "partner", "oem", "alliances", "technology-partners")),
+    "testimonials": (1.5, ("testimonials", "reviews")),
+    "brochure": (2.0, ("brochure", "datasheet", "catalog", "company-profile")),
+}
+# Topics a good selection should cover; confidence is the share of them found.
+CORE_TOPICS = ("about", "contact", "offerings")
+# Each document costs a long extraction, so only ones describing the company are read.
+DOC_TOPICS = ("brochure", "about", "offerings", "case_studies", "clients")
+
+SKIP_WORDS = (
+    "login", "signin", "sign-in", "register", "cart", "checkout", "privacy", "terms",
+    "cookie", "cookies", "sitemap", "feed", "wp-login", "wp-admin",
+)
+# Whole words of the path only, so /feedback, /registered-office or /homepage are kept.
+SKIP_RE = re.compile(r"(?<![a-z0-9])(?:" + "|".join(map(re.escape, SKIP_WORDS)) + r")(?![a-z0-9])")
+# Archive listings (/tag/x, /author/x, /page/2): skipped when a whole path segment.
+SKIP_SEGMENTS = ("tag", "author", "page")
+WORD_RE = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+
+def canonical_link(href):
+    href, _ = urldefrag(href.strip())
+    return href.rstrip("/")
+
+
+def is_doc(href):
+    return urlparse(href).path.lower().endswith(DOC_EXTENSIONS)
+
+
+def _topic(text):
+    """Returns (topic, weight) for the best topic matching text, or (None, 0)."""
+    best, best_weight = None, 0.0
+    for topic, (weight, words) in TOPICS.items():
+        if weight > best_weight and any(word in text for word in words):
+            best, best_weight = topic, weight
+    return best, best_weight
+
+
+def score_link(href, text, position, total):
+    """Scores one link; returns (score, topic)."""
+    path = urlparse(href).path.lower()
+    segments = [part for part in path.split("/") if part]
+    if SKIP_RE.search(path) or any(segment in SKIP_SEGMENTS for segment in segments[:-1]):
+        return 0.0, None
+    path_topic, path_weight = _topic(path)
+    anchor = " ".join(WORD_RE.findall((text or "").lower())).replace(" ", "-")
+    text_topic, text_weight = _topic(anchor)
+    topic = path_topic or text_topic
+    score = path_weight + 0.8 * text_weight
+    if not topic:
+        return 0.0, None
+    # Shallow pages are section landings; deep ones are usually single posts.
+    depth = len(segments)
+    score -= 0.5 * max(0, depth - 2)
+    # Header navigation comes first in the page, so earlier links get a small boost.
+    score += 0.5 * (1 - position / max(1, total))
+    return max(score, 0.0), topic
+
+
+def select_links(links, base_url=None, limit=5, max_docs=5):
+    """
+    Ranks crawl4ai internal links ({"href", "text"} dicts) and returns
+    (picks, confidence), where picks has MeaningFullLinks' web_urls and doc_urls.
+
+    Web pages are chosen best-first, one per topic before any topic gets a second
+    page. Documents doc_ingest can read are picked when they are on a DOC_TOPICS topic. Confidence is the share of CORE_TOPICS covered by the picks; a low value
+    means the site's links did not say enough and the LLM should choose instead.
+    """
+    home = canonical_link(base_url) if base_url else None
+    seen, web, docs = set(), [], []
+    for position, link in enumerate(links):
+        href = canonical_link(link.get("href") or "")
+        if not href or href == home or href in seen:
+            continue
+        seen.add(href)
+        if urlparse(href).path.lower().endswith(OTHER_FILES):
+            continue
+        score, topic = score_link(href, link.get("text"), position, len(links))
+        if is_doc(href):
+            if topic in DOC_TOPICS:
+                docs.append((score + 1.0, position, href))
+        elif score > 0:
+            web.append((score, position, href, topic))
+
+    web.sort(key=lambda item: (-item[0], item[1]))
+    picked, topics = [], set()
+    for score, _, href, topic in web:
+        if topic not in topics and len(picked) < limit:
+            picked.append(href)
+            topics.add(topic)
+    for score, _, href, topic in web:
+        if href not in picked and len(picked) < limit:
+            picked.append(href)
+
+    docs.sort(key=lambda item: (-item[0], item[1]))
+    picks = {"web_urls": picked, "doc_urls": [href for _, _, href in docs[:max_docs]]}
+    confidence = len(topics & set(CORE_TOPICS)) / len(CORE_TOPICS)
+    return picks, confidence
+
+
+def save_fixture(path, url, links, llm_picks, ranker_picks):
+    """Appends one home page's links with the LLM's and the ranker's picks as a JSON line."""
+    with open(path, "a") as f:
+        f.write(json.dumps({"url": url, "links": links, "llm": llm_picks, "ranker": ranker_picks}) + "\n")
@@ -0,0 +1,153 @@
+# offline bulk extraction: chat completion requests are written to a JSONL batch file,
+# submitted to a batch backend and collected once the whole batch has finished.
+
+import json
+import os
+import shutil
+import time
+import uuid
+
+ENDPOINT = "/v1/chat/completions"
+
+
+def response_format_param(model):
+    """The json_schema response_format that parse() would send for a pydantic model."""
+    schema = model.model_json_schema()
+    schema["additionalProperties"] = False
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": model.__name__, "schema": schema, "strict": True},
+    }
+
+
+def batch_line(custom_id, model, messages, response_format=None, temperature=None, **options):
+    body = {"model": model, "messages": messages, **options}
+    if response_format is not None:
+        body["response_format"] = response_format_param(response_format)
+    if temperature is not None:
+        body["temperature"] = temperature
+    return {"custom_id": custom_id, "method": "POST", "url": ENDPOINT, "body": body}
+
+
+class OpenAIBatchBackend:
+    """Submits batch files through the OpenAI Batch API (results within 24h, at half price)."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def submit(self, path):
+        with open(path, "rb") as f:
+            uploaded = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id, endpoint=ENDPOINT, completion_window="24h"
+        )
+        return batch.id
+
+    def status(self, batch_id):
+        return self.client.batches.retrieve(batch_id).status
+
+    def results(self, batch_id):
+        batch = self.client.batches.retrieve(batch_id)
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                for line in self.client.files.content(file_id).text.splitlines():
+                    if line.strip():
+                        yield json.loads(line)
+
+
+def empty_response(body):
+    """Default LocalBatchBackend responder: an object with every schema field empty."""
+    response_format = body.get("response_format")
+    if not response_format:
+        return ""
+    properties = response_format["json_schema"]["schema"].get("properties", {})
+    return json.dumps(
+        {name: [] if spec.get("type") == "array" else "" for name, spec in properties.items()}
+    )
+
+
+class LocalBatchBackend:
+    """
+    File-based stand-in for a batch API, for testing bulk runs without a network.
+
+    submit() copies the batch file into `directory`; the first status() call answers
+    every request with respond(body) (the message content to return) and writes the
+    output file in the OpenAI batch output format.
+    """
+
+    def __init__(self, directory="local_batches", respond=empty_response):
+        self.directory = directory
+        self.respond = respond
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, batch_id, kind):
+        return os.path.join(self.directory, f"{batch_id}.{kind}.jsonl")
+
+    def submit(self, path):
+        batch_id = f"local_{uuid.uuid4().hex[:12]}"
+        shutil.copyfile(path, self._path(batch_id, "input"))
+        return batch_id
+
+    def status(self, batch_id):
+        output = self._path(batch_id, "output")
+        if not os.path.exists(output):
+            with open(self._path(batch_id, "input")) as src, open(output, "w") as dst:
+                for line in src:
+                    if not line.strip():
+                        continue
+                    request = json.loads(line)
+                    content = self.respond(request["body"])
+                    body = {
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}}],
+                        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                    }
+                    dst.write(
+                        json.dumps(
+                            {
+                                "custom_id": request["custom_id"],
+                                "response": {"status_code": 200, "body": body},
+                                "error": None,
+                            }
+                        )
+                        + "\n"
+                    )
+        return "completed"
+
+    def results(self, batch_id):
+        with open(self._path(batch_id, "output")) as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+FINISHED = ("completed", "failed", "expired", "cancelled")
+
+
+def run_batch_file(backend, path, poll_interval=60, timeout=25 * 3600, log=print):
+    """
+    Submits the batch file, polls until the batch finishes and returns
+    {custom_id: (content, usage)} for every request that succeeded.
+    """
+    batch_id = backend.submit(path)
+    log(f"Submitted {path} as batch {batch_id}")
+    started = time.monotonic()
+    while True:
+        status = backend.status(batch_id)
+        if status in FINISHED:
+            break
+        if time.monotonic() - started > timeout:
+            raise TimeoutError(f"batch {batch_id} still {status} after {timeout}s")
+        log(f"Batch {batch_id}: {status}")
+        time.sleep(poll_interval)
+    log(f"Batch {batch_id} {status} after {time.monotonic() - started:.0f}s")
+
+    results = {}
+    for line in backend.results(batch_id):
+        response = line.get("response") or {}
+        if response.get("status_code") != 200:
+            continue
+        body = response["body"]
+        content = body["choices"][0]["message"].get("content")
+        if content is not None:
+            results[line["custom_id"]] = (content, body.get("usage") or {})
+    return results
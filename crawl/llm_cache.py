@@ -0,0 +1,142 @@
+# on-disk cache of LLM extraction responses, so re-running the pipeline over unchanged
+# page content does not pay for the same completion twice.
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+DEFAULT_LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite")
+
+
+def normalize_messages(messages):
+    """Collapses whitespace in message contents so re-indented prompts share a cache entry."""
+    normalized = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            content = re.sub(r"\s+", " ", content).strip()
+        normalized.append({"role": message.get("role"), "content": content})
+    return normalized
+
+
+def cache_key(model, messages, response_format=None, temperature=None, **options):
+    schema = response_format.model_json_schema() if response_format is not None else None
+    payload = {
+        "model": model,
+        "messages": normalize_messages(messages),
+        "schema": schema,
+        "temperature": temperature,
+        "options": options,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class LLMCache:
+    """
+    SQLite-backed store of chat completion contents, keyed by model, normalized
+    messages, response schema, temperature and any other request options.
+
+    Entries older than `ttl` seconds are treated as missing. The store is trimmed to
+    `max_bytes` by evicting the least recently used responses.
+    """
+
+    def __init__(self, path=DEFAULT_LLM_CACHE_PATH, ttl=7 * 24 * 3600, max_bytes=50 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                content TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL
+            )"""
+        )
+        self._db.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT content, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] >= self.ttl:
+                return None
+            self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._db.commit()
+        return row[0]
+
+    def lookup(self, key):
+        """get() that also counts the result as a hit or a miss, for callers doing their own requests."""
+        content = self.get(key)
+        self.stats["hits" if content is not None else "misses"] += 1
+        return content
+
+    def put(self, key, model, content):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, content, now, now, len(content.encode())),
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        (total,) = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at ASC"
+        ).fetchall():
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.stats["evictions"] += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    async def complete(self, client, model, messages, response_format=None, temperature=None, **options):
+        """
+        Returns the completion for this request, calling `client` (an AsyncOpenAI) only on
+        a cache miss. With a pydantic response_format the result is an instance of it,
+        otherwise the message content string.
+        """
+        key = cache_key(model, messages, response_format, temperature, **options)
+        content = self.lookup(key)
+        if content is None:
+            if temperature is not None:
+                options["temperature"] = temperature
+            if response_format is None:
+                completion = await client.chat.completions.create(model=model, messages=messages, **options)
+            else:
+                completion = await client.beta.chat.completions.parse(
+                    model=model, messages=messages, response_format=response_format, **options
+                )
+            message = completion.choices[0].message
+            if message.content is None:
+                raise ValueError(f"{model} returned no content: {getattr(message, 'refusal', None)}")
+            content = message.content
+            self.put(key, model, content)
+        return response_format.model_validate_json(content) if response_format is not None else content
+
+    def hit_rate(self):
+        total = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / total if total else 0.0
+
+    def report(self):
+        print(
+            f"LLM cache: {self.stats['hits']} hit(s), {self.stats['misses']} miss(es), "
+            f"{self.stats['evictions']} eviction(s), hit rate {self.hit_rate():.0%}"
+        )
+
+    def close(self):
+        self._db.close()
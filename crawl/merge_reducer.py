@@ -0,0 +1,94 @@
+# combines the per-page CompanyDetails records of one site field by field, replacing the
+# final "merge these" LLM call that grew with every page crawled.
+
+import re
+from collections import Counter
+
+# Values the extraction prompt tends to return for "not on this page".
+PLACEHOLDERS = {
+    "", "-", "n/a", "na", "none", "null", "unknown", "not available", "not provided",
+    "not specified", "not mentioned", "not found", "not applicable", "no information",
+}
+# Longer filler in the same vein: "Not mentioned in the provided content", "No phone
+# number found", "Information not available on the page". Text with digits is never
+# filler, so addresses such as "No. 12, Providence Road" are kept.
+PLACEHOLDER_RE = re.compile(
+    r"^(?!.*\d)(?:(?:not|no)\b.*\b(?:mention|found|provid|availab|specifi|given|listed|stated)"
+    r"|(?:information|details?|data)\s+(?:is\s+|are\s+)?not\s+(?:mention|found|provid|availab|specifi|given))",
+    re.IGNORECASE,
+)
+# Free-text fields where the fullest description wins instead of a vote.
+TEXT_FIELDS = ("company_profile",)
+PHONE_FIELDS = ("mobile_number", "general_contact_number")
+
+
+def is_placeholder(value):
+    if value is None:
+        return True
+    text = re.sub(r"[\s.]+", " ", str(value)).strip().lower()
+    return text in PLACEHOLDERS or bool(PLACEHOLDER_RE.match(text))
+
+
+def normalize(field, value):
+    """The comparison key for a value: digits for phone numbers, folded text otherwise."""
+    if field in PHONE_FIELDS:
+        digits = re.sub(r"\D", "", value)
+        return digits[-10:] or value
+    return re.sub(r"\s+", " ", value).strip(" .,;").casefold()
+
+
+def merge_list(field, values):
+    """Union of every record's list, in first-seen order, without duplicates or placeholders."""
+    merged, seen = [], set()
+    for items in values:
+        for item in items or []:
+            if is_placeholder(item):
+                continue
+            key = normalize(field, str(item))
+            if key not in seen:
+                seen.add(key)
+                merged.append(str(item).strip())
+    return merged
+
+
+def vote_scalar(field, values, weights):
+    """
+    Returns the candidates as (value, score) pairs, best first. Equal values (after
+    normalize) pool their weights; ties go to the earliest record. For TEXT_FIELDS
+    the longest value ranks first.
+    """
+    scores, first_seen, original = Counter(), {}, {}
+    for position, (value, weight) in enumerate(zip(values, weights)):
+        if is_placeholder(value):
+            continue
+        key = normalize(field, str(value))
+        scores[key] += weight
+        first_seen.setdefault(key, position)
+        original.setdefault(key, str(value).strip())
+    if field in TEXT_FIELDS:
+        ranked = sorted(scores, key=lambda key: (-len(original[key]), first_seen[key]))
+    else:
+        ranked = sorted(scores, key=lambda key: (-scores[key], first_seen[key]))
+    return [(original[key], scores[key]) for key in ranked]
+
+
+def merge_records(records, fields, list_fields, weights=None):
+    """
+    Merges per-page records (dicts) into one. List fields are unioned; scalar fields
+    are voted on, each record counting with its weight (1 by default).
+
+    Returns (merged, conflicts): conflicts maps each scalar field whose top two
+    candidates tied on weight to its candidate values, for an optional tie-break.
+    """
+    weights = weights or [1.0] * len(records)
+    merged, conflicts = {}, {}
+    for field in fields:
+        values = [record.get(field) for record in records]
+        if field in list_fields:
+            merged[field] = merge_list(field, values)
+            continue
+        candidates = vote_scalar(field, values, weights)
+        merged[field] = candidates[0][0] if candidates else ""
+        if field not in TEXT_FIELDS and len(candidates) > 1 and candidates[0][1] == candidates[1][1]:
+            conflicts[field] = [value for value, score in candidates if score == candidates[0][1]]
+    return merged, conflicts
@@ -0,0 +1,242 @@
+# on-disk cache of rendered pages for the crawl4ai pipelines, so re-running an extraction
+# for an unchanged site does not re-render every page.
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from urllib.parse import urlparse, urlunparse
+
+import httpx
+from crawl4ai import CacheMode
+
+DEFAULT_CACHE_PATH = os.getenv("CRAWL_CACHE_PATH", "crawl_cache.sqlite")
+JSONLD_RE = re.compile(
+    r"<script[^>]+type=[\"']application/ld\+json[\"'][^>]*>(.*?)</script>", re.IGNORECASE | re.DOTALL
+)
+
+
+def canonical_url(url):
+    """
+    Normalizes a URL for use as a cache key: lower-cases scheme and host, drops the
+    fragment, default ports and a trailing slash on the path.
+
+    Deliberately more conservative than scrap/dedup.canonical_url, which also drops
+    tracking parameters and sorts the query: merging two frontier URLs wrongly only
+    skips a page, but a wrong cache hit serves one page's content for another, so the
+    query is kept exactly. (crawl/ and scrap/ are separate script directories with no
+    shared package, so the two helpers are not imported from one place.)
+    """
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower() or "https"
+    netloc = parsed.netloc.lower()
+    if (scheme, netloc.rsplit(":", 1)[-1]) in (("http", "80"), ("https", "443")):
+        netloc = netloc.rsplit(":", 1)[0]
+    path = parsed.path.rstrip("/") or "/"
+    return urlunparse((scheme, netloc, path, "", parsed.query, ""))
+
+
+def extract_jsonld(html):
+    """Returns the parsed schema.org JSON-LD blocks of a page, skipping malformed ones."""
+    blocks = []
+    for raw in JSONLD_RE.findall(html or ""):
+        try:
+            blocks.append(json.loads(raw))
+        except ValueError:
+            continue
+    return blocks
+
+
+@dataclass
+class CachedPage:
+    url: str
+    success: bool
+    markdown: str = ""
+    links: dict = field(default_factory=dict)
+    jsonld: list = field(default_factory=list)
+    etag: str = ""
+    last_modified: str = ""
+    fetched_at: float = 0.0
+    from_cache: bool = False
+    # True for documents read by doc_ingest rather than crawled pages.
+    document: bool = False
+
+
+class PageCache:
+    """
+    SQLite-backed store of rendered markdown, links and HTTP validators per canonical URL.
+
+    Entries younger than `ttl` seconds are served as-is. Older entries are revalidated
+    with a conditional GET (If-None-Match / If-Modified-Since); a 304 refreshes the entry,
+    anything else re-renders the page. The store is trimmed to `max_bytes` by evicting
+    the least recently used pages.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=24 * 3600, max_bytes=200 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                markdown TEXT NOT NULL,
+                links TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL
+            )"""
+        )
+        # JSON-LD blocks, added to caches created before they were stored.
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(pages)")}
+        if "jsonld" not in columns:
+            self._db.execute("ALTER TABLE pages ADD COLUMN jsonld TEXT")
+        self._db.commit()
+
+    def get(self, url):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT markdown, links, etag, last_modified, fetched_at, jsonld FROM pages WHERE url = ?",
+                (canonical_url(url),),
+            ).fetchone()
+        if row is None:
+            return None
+        markdown, links, etag, last_modified, fetched_at, jsonld = row
+        return CachedPage(
+            url=url,
+            success=True,
+            markdown=markdown,
+            links=json.loads(links),
+            jsonld=json.loads(jsonld or "[]"),
+            etag=etag or "",
+            last_modified=last_modified or "",
+            fetched_at=fetched_at,
+            from_cache=True,
+        )
+
+    def put(self, page):
+        links = json.dumps(page.links)
+        jsonld = json.dumps(page.jsonld)
+        size = len(page.markdown.encode()) + len(links.encode()) + len(jsonld.encode())
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages "
+                "(url, markdown, links, etag, last_modified, fetched_at, accessed_at, size, jsonld) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    canonical_url(page.url),
+                    page.markdown,
+                    links,
+                    page.etag,
+                    page.last_modified,
+                    page.fetched_at or now,
+                    now,
+                    size,
+                    jsonld,
+                ),
+            )
+            self._evict()
+            self._db.commit()
+
+    def _touch(self, url, refreshed=False):
+        now = time.time()
+        with self._lock:
+            if refreshed:
+                self._db.execute(
+                    "UPDATE pages SET accessed_at = ?, fetched_at = ? WHERE url = ?",
+                    (now, now, canonical_url(url)),
+                )
+            else:
+                self._db.execute(
+                    "UPDATE pages SET accessed_at = ? WHERE url = ?", (now, canonical_url(url))
+                )
+            self._db.commit()
+
+    def _evict(self):
+        (total,) = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()
+        if total <= self.max_bytes:
+            return
+        for url, size in self._db.execute(
+            "SELECT url, size FROM pages ORDER BY accessed_at ASC"
+        ).fetchall():
+            self._db.execute("DELETE FROM pages WHERE url = ?", (url,))
+            self.stats["evictions"] += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    async def _not_modified(self, page):
+        headers = {}
+        if page.etag:
+            headers["If-None-Match"] = page.etag
+        if page.last_modified:
+            headers["If-Modified-Since"] = page.last_modified
+        if not headers:
+            return False
+        try:
+            async with httpx.AsyncClient(follow_redirects=True, timeout=10) as client:
+                # Stream so a changed page's body is never downloaded; it gets re-rendered anyway.
+                async with client.stream("GET", page.url, headers=headers) as response:
+                    return response.status_code == 304
+        except httpx.HTTPError:
+            return False
+
+    async def fetch(self, crawler, url, config):
+        """
+        Returns a CachedPage for url, rendering it with crawler.arun only when there is
+        no fresh or revalidated copy on disk.
+        """
+        cached = self.get(url)
+        if cached is not None:
+            if time.time() - cached.fetched_at < self.ttl:
+                self.stats["hits"] += 1
+                self._touch(url)
+                return cached
+            if await self._not_modified(cached):
+                self.stats["revalidated"] += 1
+                self._touch(url, refreshed=True)
+                return cached
+
+        self.stats["misses"] += 1
+        # CrawlerRunConfig.clone() exists in the pinned crawl4ai 0.4.248 and round-trips
+        # every option the crawl scripts set through to_dict()/from_kwargs().
+        result = await crawler.arun(url=url, config=config.clone(cache_mode=CacheMode.BYPASS))
+        if not result.success:
+            return CachedPage(url=url, success=False)
+
+        headers = {k.lower(): v for k, v in (result.response_headers or {}).items()}
+        page = CachedPage(
+            url=url,
+            success=True,
+            markdown=result.markdown_v2.raw_markdown,
+            links=result.links,
+            jsonld=extract_jsonld(result.html),
+            etag=headers.get("etag", ""),
+            last_modified=headers.get("last-modified", ""),
+            fetched_at=time.time(),
+        )
+        self.put(page)
+        return page
+
+    def hit_rate(self):
+        served = self.stats["hits"] + self.stats["revalidated"]
+        total = served + self.stats["misses"]
+        return served / total if total else 0.0
+
+    def report(self):
+        print(
+            f"Page cache: {self.stats['hits']} hit(s), {self.stats['revalidated']} revalidated, "
+            f"{self.stats['misses']} miss(es), {self.stats['evictions']} eviction(s), "
+            f"hit rate {self.hit_rate():.0%}"
+        )
+
+    def close(self):
+        self._db.close()
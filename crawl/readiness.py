@@ -0,0 +1,42 @@
+# adaptive page-readiness for crawl4ai runs: a `wait_for` condition that passes once the
+# page text stops changing, instead of a fixed sleep after arun.
+
+import re
+
+READY_SIGNAL_RE = re.compile(r'data-ready-signal="([a-z_]+):(\d+)"')
+
+
+def text_stable_wait(quiet_ms=750, max_ms=10000):
+    """
+    Returns a CrawlerRunConfig.wait_for condition. crawl4ai polls it every 100 ms; it
+    passes after quiet_ms without text changes ("text_stable") or once max_ms has
+    elapsed ("hard_cap"), and tags <html> with the signal so ready_signal() can read it.
+    """
+    return f"""js:() => {{
+        const now = Date.now();
+        const state = window.__readyState || (window.__readyState = {{start: now, sig: null, at: now}});
+        const body = document.body;
+        const sig = body ? body.innerText.length + ":" + body.getElementsByTagName("*").length : "";
+        let signal = null;
+        if (sig !== state.sig) {{
+            state.sig = sig;
+            state.at = now;
+        }} else if (sig && now - state.at >= {quiet_ms}) {{
+            signal = "text_stable";
+        }}
+        if (!signal && now - state.start >= {max_ms}) {{
+            signal = "hard_cap";
+        }}
+        if (signal) {{
+            document.documentElement.setAttribute("data-ready-signal", signal + ":" + (now - state.start));
+        }}
+        return signal !== null;
+    }}"""
+
+
+def ready_signal(result):
+    """Returns (signal, elapsed_ms) recorded on a CrawlResult, or ("unknown", None)."""
+    match = READY_SIGNAL_RE.search(result.html or "")
+    if not match:
+        return "unknown", None
+    return match.group(1), int(match.group(2))
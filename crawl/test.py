@@ -5,12 +5,14 @@ import os
 from crawl4ai import AsyncWebCrawler, BrowserConfig, CacheMode, CrawlerRunConfig
 from dotenv import load_dotenv
 from openai import OpenAI
+from page_cache import PageCache
 from pydantic import BaseModel
 
 load_dotenv()
 open_ai_key = os.getenv("OPENAI_API_KEY")
 os.environ["OPENAI_API_KEY"]
 client = OpenAI()
+page_cache = PageCache()
 
 
 class CompanyDetails(BaseModel):
@@ -41,8 +43,8 @@ async def fetch_company_details():
     run_conf = CrawlerRunConfig(cache_mode=CacheMode.BYPASS)
 
     async with AsyncWebCrawler(config=browser_conf) as crawler:
-        result = await crawler.arun(url="https://www.ldsinfotech.com", config=run_conf)
-        details = result.markdown
+        page = await page_cache.fetch(crawler, "https://www.ldsinfotech.com", run_conf)
+        details = page.markdown
 
     completion = client.beta.chat.completions.parse(
         model="gpt-4o-mini",
@@ -80,6 +82,8 @@ async def fetch_company_details():
         response_format=CompanyDetails,
     )
 
+    page_cache.report()
+
     # Return the parsed response
     event = completion.choices[0].message.parsed
     return event
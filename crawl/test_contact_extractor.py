@@ -0,0 +1,73 @@
+import pytest
+from contact_extractor import ContactExtractor, from_jsonld, is_mobile
+
+
+@pytest.fixture
+def extractor():
+    return ContactExtractor()
+
+
+@pytest.mark.parametrize(
+    "markdown",
+    [
+        "Trusted by 1500000000 users worldwide.",
+        "Order 98765432100 shipped.",
+        "Since 2004 2005 2006 we have grown.",
+    ],
+)
+def test_bare_digit_runs_are_not_phone_numbers(extractor, markdown):
+    found = extractor.extract(markdown)
+    assert "general_contact_number" not in found
+    assert "mobile_number" not in found
+
+
+@pytest.mark.parametrize(
+    "markdown, field, number",
+    [
+        ("[Call us](tel:+91-80-4123-4567)", "general_contact_number", "+91-80-4123-4567"),
+        ("Phone: 9876543210", "mobile_number", "9876543210"),
+        ("Reach the office on +91 80 4123 4567 any weekday.", "general_contact_number", "+91 80 4123 4567"),
+        ("Reach us on 080-4123 4567.", "general_contact_number", "080-4123 4567"),
+        ("Mobile: 98765 43210", "mobile_number", "98765 43210"),
+        ("Sales +91 98765 43210", "mobile_number", "+91 98765 43210"),
+    ],
+)
+def test_phone_numbers(extractor, markdown, field, number):
+    assert extractor.extract(markdown)[field] == number
+
+
+@pytest.mark.parametrize(
+    "number, mobile",
+    [
+        ("+91 80 1111 2222", False),
+        ("+91-80-41234567", False),
+        ("+91 712 123 4567", False),
+        ("080 4123 4567", False),
+        ("+91 98765 43210", True),
+        ("+919876543210", True),
+        ("9876543210", True),
+        ("+91 44 2811 2222", False),
+    ],
+)
+def test_is_mobile(number, mobile):
+    assert is_mobile(number) is mobile
+
+
+def test_jsonld_list_values_use_the_first_item():
+    found = from_jsonld(
+        [{"@type": "Organization", "telephone": ["+91 80 1111 2222", "+91 98765 43210"], "email": ["info@acme.in"]}]
+    )
+    assert found == {"general_contact_number": "+91 80 1111 2222", "email_id": "info@acme.in"}
+
+
+def test_address_skips_image_and_link_lines(extractor):
+    markdown = "\n".join(
+        [
+            "Address:",
+            "![logo](logo@2x.png)",
+            "12 MG Road, Ashok Nagar",
+            "[Get directions](https://maps.example.com/acme)",
+            "Bengaluru 560001",
+        ]
+    )
+    assert extractor.extract(markdown)["address"] == "12 MG Road, Ashok Nagar, Bengaluru 560001"
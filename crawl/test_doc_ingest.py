@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+from doc_ingest import DocIngestor, pdf_pages
+
+pytest.importorskip("pypdf")
+
+
+def write_pdf(path, page_texts):
+    """Writes a minimal PDF with one Helvetica text line per page."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in page_texts:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out, offsets = b"%PDF-1.4\n", []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode()
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(out)
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    path = tmp_path / "brochure.pdf"
+    write_pdf(path, [f"Page {i} of the Acme brochure" for i in range(1, 11)])
+    return str(path)
+
+
+def test_pdf_pages_reads_real_pages_up_to_max_pages(pdf):
+    assert [text.strip() for text in pdf_pages(pdf, 2)] == [
+        "Page 1 of the Acme brochure",
+        "Page 2 of the Acme brochure",
+    ]
+    assert len(list(pdf_pages(pdf, 50))) == 10
+
+
+def test_read_pdf_in_page_order_up_to_max_pages(pdf):
+    ingestor = DocIngestor(max_pages=7)
+    try:
+        text = asyncio.run(ingestor.read(pdf, "pdf"))
+    finally:
+        ingestor.close()
+    assert text.split("\n\n") == [f"Page {i} of the Acme brochure" for i in range(1, 8)]
+    assert ingestor.stats["pages"] == 7
+
+
+def test_read_pdf_stops_at_max_tokens(pdf):
+    ingestor = DocIngestor(max_tokens=3, count_tokens=lambda text: 1)
+    try:
+        text = asyncio.run(ingestor.read(pdf, "pdf"))
+    finally:
+        ingestor.close()
+    assert text.split("\n\n") == [f"Page {i} of the Acme brochure" for i in range(1, 4)]
+    assert ingestor.stats["capped"] == 1
@@ -0,0 +1,47 @@
+import pytest
+from link_ranker import score_link, select_links
+
+
+@pytest.mark.parametrize(
+    "path",
+    ["/login", "/wp-login.php", "/privacy-policy", "/cart", "/rss-feed", "/tag/about", "/page/2/about-us"],
+)
+def test_skipped_paths(path):
+    assert score_link(f"https://example.com{path}", "About us", 0, 10) == (0.0, None)
+
+
+@pytest.mark.parametrize(
+    "path, topic",
+    [
+        ("/homepage/about", "about"),
+        ("/vintage/about", "about"),
+        ("/feedback-and-contact", "contact"),
+        ("/registered-office", "contact"),
+        ("/page-speed/services", "offerings"),
+    ],
+)
+def test_skip_words_match_whole_words_only(path, topic):
+    score, found = score_link(f"https://example.com{path}", "", 0, 10)
+    assert found == topic and score > 0
+
+
+def test_only_readable_company_documents_are_picked():
+    links = [
+        {"href": f"https://example.com{path}", "text": text}
+        for path, text in [
+            ("/privacy-policy.pdf", "Privacy"),
+            ("/terms.pdf", "Terms"),
+            ("/careers/job-application-form.docx", "Apply"),
+            ("/sitemap.xml.txt", ""),
+            ("/files/company-profile.pptx", "Company profile"),
+            ("/files/price-list.xls", "Products"),
+            ("/files/brochure.pdf", "Download"),
+            ("/files/ERP-datasheet.docx", "Datasheet"),
+        ]
+    ]
+    picks, _ = select_links(links, base_url="https://example.com")
+    assert sorted(picks["doc_urls"]) == [
+        "https://example.com/files/ERP-datasheet.docx",
+        "https://example.com/files/brochure.pdf",
+    ]
+    assert picks["web_urls"] == []
@@ -0,0 +1,53 @@
+import pytest
+from merge_reducer import is_placeholder, merge_records
+
+FIELDS = ["company_name", "general_contact_number", "address", "products"]
+LIST_FIELDS = ("products",)
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        None,
+        "",
+        "N/A",
+        "Not mentioned",
+        "Not mentioned in the provided content",
+        "Not mentioned in the provided content.",
+        "No phone number found",
+        "No email address provided on this page",
+        "Not available",
+        "Not explicitly stated",
+        "Information not available",
+        "Details are not provided in the text",
+    ],
+)
+def test_placeholders(value):
+    assert is_placeholder(value)
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        "Acme Technologies Pvt Ltd",
+        "+91 80 4123 4567",
+        "No. 12, Providence Road, Bengaluru 560001",
+        "Notable Systems",
+        "Nova Providers Inc",
+    ],
+)
+def test_real_values(value):
+    assert not is_placeholder(value)
+
+
+def test_filler_does_not_outvote_a_real_value():
+    records = [
+        {"general_contact_number": "No phone number found", "products": ["Not mentioned"]},
+        {"general_contact_number": "No phone number found", "products": ["ERP"]},
+        {"general_contact_number": "+91 80 4123 4567", "products": []},
+    ]
+    merged, conflicts = merge_records(records, FIELDS, LIST_FIELDS)
+    assert merged["general_contact_number"] == "+91 80 4123 4567"
+    assert merged["products"] == ["ERP"]
+    assert merged["address"] == ""
+    assert conflicts == {}
@@ -1,7 +1,9 @@
 import asyncio
 
-from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig
+from browser_pool import get_pool
+from crawl4ai import BrowserConfig, CrawlerRunConfig
 from crawl4ai.content_filter_strategy import PruningContentFilter
+from readiness import ready_signal, text_stable_wait
 
 # Configure the content filter (kept as is)
 prune_filter = PruningContentFilter(
@@ -14,6 +16,8 @@ prune_filter = PruningContentFilter(
 browser_conf = BrowserConfig(
     headless=False,
 )
+# One warm browser shared by every home_scrape call in this process.
+crawler_pool = get_pool(size=1, browser_config=browser_conf)
 
 # Update the crawler run configuration:
 # If your version supports waiting for JavaScript to load, set a delay (e.g., js_wait_time)
@@ -24,15 +28,17 @@ config = CrawlerRunConfig(
     image_description_min_word_threshold=False,
     # This is an example parameter – check your documentation for the exact name
     js_code="window.scrollTo(0, document.body.scrollHeight);",
+    # Finish once the page text has settled instead of sleeping a fixed amount after arun.
+    wait_for=text_stable_wait(quiet_ms=750, max_ms=10000),
 )
 
 
 async def home_scrape(url):
-    async with AsyncWebCrawler(config=browser_conf) as crawler:
+    async with crawler_pool.lease() as crawler:
         result = await crawler.arun(url=url, config=config)
 
-        # Optionally, wait a few extra seconds for any delayed JS execution or challenge resolution
-        await asyncio.sleep(5)
+        signal, elapsed_ms = ready_signal(result)
+        print(f"Page ready after {elapsed_ms} ms ({signal}).")
 
         print(result)
         if result.success:
@@ -49,6 +55,8 @@ async def home_scrape(url):
 
 async def main(url: str):
     await home_scrape(url=url)
+    crawler_pool.report()
+    await crawler_pool.close()
 
 
 if __name__ == "__main__":
@@ -3,17 +3,31 @@ import json
 import os
 from typing import List
 
-from crawl4ai import AsyncWebCrawler, CrawlerRunConfig
+from browser_pool import get_pool
+from context_budget import ContextBudget
+from crawl4ai import CrawlerRunConfig
 from crawl4ai.content_filter_strategy import PruningContentFilter
 from crawl4ai.markdown_generation_strategy import DefaultMarkdownGenerator
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+from page_cache import PageCache
 from pydantic import BaseModel, Field
 
 load_dotenv()
 open_ai_key = os.getenv("OPENAI_API_KEY")
 os.environ["OPENAI_API_KEY"]
 client = OpenAI()
+async_client = AsyncOpenAI()
+page_cache = PageCache()
+# Each page is trimmed to a token budget before extraction.
+context_budget = ContextBudget()
+# Warm browsers leased by home_scrape and mini_links_scrape instead of launching their own.
+crawler_pool = get_pool(size=2, max_pages=200)
+# Sub-page crawls and their extraction calls run concurrently, each under its own cap.
+CRAWL_CONCURRENCY = 4
+LLM_CONCURRENCY = 4
+crawl_semaphore = asyncio.Semaphore(CRAWL_CONCURRENCY)
+llm_semaphore = asyncio.Semaphore(LLM_CONCURRENCY)
 # Step 1: Create a pruning filter
 prune_filter = PruningContentFilter(
     # Lower → more content retained, higher → more content pruned
@@ -141,8 +155,8 @@ class MeaningFullLinks(BaseModel):
 
 
 async def home_scrape(url):
-    async with AsyncWebCrawler() as crawler:
-        result = await crawler.arun(url=url, config=config)
+    async with crawler_pool.lease() as crawler:
+        result = await page_cache.fetch(crawler, url, config)
         if result.success:
             internal_links = result.links.get("internal", [])
 
@@ -150,57 +164,59 @@ async def home_scrape(url):
                 links.pop("title", None)
                 links.pop("base_domain", None)
 
-    completion = await asyncio.to_thread(
-        client.chat.completions.create,
-        model="gpt-4o-mini",
-        messages=[
-            {
-                "role": "system",
-                "content": """On the basis given content, you have to extract the only 
-                meaningful information about the company. The content provided you is the scrapped content 
-                from the company's site and in markdown format""",
-            },
-            {
-                "role": "user",
-                "content": f"Here is scrapped data of the companies web site: \n\n{result.markdown_v2.raw_markdown}",
-            },
-        ],
-    )
-    scrapped_links = await asyncio.to_thread(
-        client.beta.chat.completions.parse,
-        model="gpt-4o-mini",
-        messages=[
-            {
-                "role": "system",
-                "content": "Extract the links those may contain the meaningful information about the company",
-            },
-            {
-                "role": "user",
-                "content": f"""Here is scrapped links from the companies web site: \n\n{str(internal_links)}. 
-                From these links, I want only few links. Those can provide these information 
-                company_name
-                email_id
-                mobile_number
-                general_contact_number
-                address
-                locations_offices
-                categories
-                products
-                industry_types
-                number_of_years
-                number_of_customers
-                number_of_employees
-                customer_names
-                case_studies
-                product_brochure
-                client_testimonials
-                OEMs
-                company_profile
-                management_details""",
-            },
-        ],
-        response_format=MeaningFullLinks,
-    )
+    async with llm_semaphore:
+        completion = await asyncio.to_thread(
+            client.chat.completions.create,
+            model="gpt-4o-mini",
+            messages=[
+                {
+                    "role": "system",
+                    "content": """On the basis given content, you have to extract the only 
+                    meaningful information about the company. The content provided you is the scrapped content 
+                    from the company's site and in markdown format""",
+                },
+                {
+                    "role": "user",
+                    "content": f"Here is scrapped data of the companies web site: \n\n{context_budget.compress(result.markdown)}",
+                },
+            ],
+        )
+    async with llm_semaphore:
+        scrapped_links = await asyncio.to_thread(
+            client.beta.chat.completions.parse,
+            model="gpt-4o-mini",
+            messages=[
+                {
+                    "role": "system",
+                    "content": "Extract the links those may contain the meaningful information about the company",
+                },
+                {
+                    "role": "user",
+                    "content": f"""Here is scrapped links from the companies web site: \n\n{str(internal_links)}. 
+                    From these links, I want only few links. Those can provide these information 
+                    company_name
+                    email_id
+                    mobile_number
+                    general_contact_number
+                    address
+                    locations_offices
+                    categories
+                    products
+                    industry_types
+                    number_of_years
+                    number_of_customers
+                    number_of_employees
+                    customer_names
+                    case_studies
+                    product_brochure
+                    client_testimonials
+                    OEMs
+                    company_profile
+                    management_details""",
+                },
+            ],
+            response_format=MeaningFullLinks,
+        )
     sorted_links = scrapped_links.choices[0].message.parsed.model_dump()
     json_sorted_links = json.dumps(sorted_links)
     print(f"{json_sorted_links= }")
@@ -210,31 +226,50 @@ async def home_scrape(url):
     return content, json_sorted_links
 
 
+async def extract_link(crawler, link):
+    """Crawls one sub-page and extracts the company details from it; None if the crawl failed."""
+    async with crawl_semaphore:
+        result = await page_cache.fetch(crawler, link, config)
+    if not result.success:
+        print(f"Skipping {link}: crawl failed")
+        return None
+    async with llm_semaphore:
+        completion = await async_client.beta.chat.completions.parse(
+            model="gpt-4o-mini",
+            messages=[
+                {
+                    "role": "system",
+                    "content": """On the basis given content, you have to extract the only
+                    meaningful information about the company. The content provided to you is the scrapped content
+                    from the company's site. Data should be in 170 words""",
+                },
+                {
+                    "role": "user",
+                    "content": f"Here is scrapped data of the companies web site: \n\n{context_budget.compress(result.markdown)}",
+                },
+            ],
+            response_format=CompanyDetails,
+        )
+    return completion.choices[0].message.content
+
+
 async def mini_links_scrape(links):
-    async with AsyncWebCrawler() as crawler:
+    async with crawler_pool.lease() as crawler:
         print("\n\n", type(f"{links= }"), "\n\n")
         web_urls = links.get("web_urls")
         doc_urls = links.get("doc_urls")
 
-        for link in web_urls:
-            result = await crawler.arun(url=link, config=config)
-            completion = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """On the basis given content, you have to extract the only 
-                        meaningful information about the company. The content provided to you is the scrapped content 
-                        from the company's site. Data should be in 170 words""",
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Here is scrapped data of the companies web site: \n\n{result.markdown_v2.raw_markdown}",
-                    },
-                ],
-                response_format=CompanyDetails,
-            )
-            content = completion.choices[0].message.content
+        # gather keeps the results in link order, so main_messages comes out the same
+        # however the crawls and extractions interleave.
+        results = await asyncio.gather(
+            *(extract_link(crawler, link) for link in web_urls), return_exceptions=True
+        )
+        for link, content in zip(web_urls, results):
+            if isinstance(content, Exception):
+                print(f"Skipping {link}: {content!r}")
+                continue
+            if content is None:
+                continue
             print(f"\n\n{content}\n\n")
             main_messages.append({"role": "user", "content": f"{content}"})
 
@@ -277,6 +312,10 @@ async def main(url: str):
         company_details_json = json.dumps(event, indent=4)
         print(company_details_json)
         print("\n\n", json.dumps(main_messages), "\n\n")
+        page_cache.report()
+        context_budget.report()
+        crawler_pool.report()
+        await crawler_pool.close()
         return company_details_json
 
 
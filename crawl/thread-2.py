@@ -1,19 +1,52 @@
 import asyncio
+import functools
 import json
 import os
-from typing import List
+import time
+from typing import List, get_origin
 
-from crawl4ai import AsyncWebCrawler, CrawlerRunConfig
+from browser_pool import get_pool
+from contact_extractor import ContactExtractor
+from context_budget import ContextBudget
+from crawl4ai import CrawlerRunConfig
 from crawl4ai.content_filter_strategy import PruningContentFilter
 from crawl4ai.markdown_generation_strategy import DefaultMarkdownGenerator
+from doc_ingest import DocIngestor
 from dotenv import load_dotenv
-from openai import OpenAI
-from pydantic import BaseModel, Field
+from link_ranker import save_fixture, select_links
+from llm_cache import LLMCache
+from merge_reducer import merge_records
+from openai import AsyncOpenAI, OpenAI
+from page_cache import CachedPage, PageCache
+from pydantic import BaseModel, Field, create_model
 
 load_dotenv()
 open_ai_key = os.getenv("OPENAI_API_KEY")
 os.environ["OPENAI_API_KEY"]
 client = OpenAI()
+async_client = AsyncOpenAI()
+page_cache = PageCache()
+# Each page is trimmed to a token budget before extraction.
+context_budget = ContextBudget()
+# Email, phones, address and brochure are read from the page before the LLM is asked.
+contact_extractor = ContactExtractor()
+# Brochures and other doc_urls: streamed to disk, read page by page on worker threads.
+# Their text is compressed to this max_tokens budget instead of the per-page one.
+doc_ingestor = DocIngestor(max_pages=30, max_tokens=8000, count_tokens=context_budget.count)
+# Extraction, link selection and merge responses, reused while the prompt is unchanged.
+llm_cache = LLMCache()
+# Warm browsers leased by home_scrape and mini_links_scrape instead of launching their own.
+crawler_pool = get_pool(size=2, max_pages=200)
+# Sub-page crawls and their extraction calls run concurrently, each under its own cap.
+CRAWL_CONCURRENCY = 4
+LLM_CONCURRENCY = 4
+crawl_semaphore = asyncio.Semaphore(CRAWL_CONCURRENCY)
+llm_semaphore = asyncio.Semaphore(LLM_CONCURRENCY)
+# Sub-pages are picked by link_ranker; below this confidence the LLM picks them instead.
+LINK_CONFIDENCE = 0.6
+# When set, every home page's links are also sent to the LLM and both picks are saved
+# here for bench_link_ranker.py.
+LINK_FIXTURES_PATH = os.getenv("LINK_FIXTURES_PATH")
 # Step 1: Create a pruning filter
 prune_filter = PruningContentFilter(
     # Lower → more content retained, higher → more content pruned
@@ -34,15 +67,6 @@ config = CrawlerRunConfig(
     image_description_min_word_threshold=False,
 )
 
-main_messages = [
-    {
-        "role": "system",
-        "content": """I am providing you the structured data that I have extracted through the company's 
-        website. The data I am sharing you one by one, as it is scrapped from each page. You have to merge 
-        these data into one. Analyze these data and never miss any valuable information.""",
-    }
-]
-
 
 class CompanyDetails(BaseModel):
     company_name: str = Field(..., description="the name of the company.")
@@ -109,43 +133,99 @@ class MeaningFullLinks(BaseModel):
     )
 
 
-async def home_scrape(url):
-    async with AsyncWebCrawler() as crawler:
-        result = await crawler.arun(url=url, config=config)
+# Per-page records are merged locally (merge_reducer); list fields are unioned.
+LIST_FIELDS = {
+    name for name, field in CompanyDetails.model_fields.items() if get_origin(field.annotation) is list
+}
+# Scalar fields whose pages disagree with no majority go to a small model when True;
+# otherwise the value from the earliest page wins.
+RESOLVE_CONFLICTS = True
+
 
-        if result.success:
-            internal_links = result.links.get("internal", [])
+@functools.lru_cache(maxsize=None)
+def remaining_details_model(known_fields):
+    """CompanyDetails without the fields that were already filled locally."""
+    return create_model(
+        "CompanyDetails",
+        **{
+            name: (field.annotation, field)
+            for name, field in CompanyDetails.model_fields.items()
+            if name not in known_fields
+        },
+    )
 
-            for links in internal_links:
-                links.pop("title", None)
-                links.pop("base_domain", None)
 
-    completion = await asyncio.to_thread(
-        client.beta.chat.completions.parse,
+def extraction_request(page, temperature):
+    """
+    Builds the CompanyDetails extraction request for a crawled page. Contact fields
+    found by contact_extractor are left out of the schema sent to the LLM; returns
+    (known, request) where known holds them and request the llm_cache.complete() kwargs.
+    Documents keep up to doc_ingestor.max_tokens tokens, web pages the context budget.
+    """
+    known = contact_extractor.extract(page.markdown, page.jsonld)
+    budget = doc_ingestor.max_tokens if page.document else None
+    request = dict(
         model="gpt-4o",
         messages=[
             {
                 "role": "system",
-                "content": """Please extract the relevant details about the company from the following information. 
-        Focus on the company's name, email address, contact number, and physical address. Identify the 
-        various locations where the company has offices. List the categories of services offered, along with 
-        any specific products the company provides. Also, extract the types of industries the company serves.
-          Include details about the company’s experience, such as how long it has been in business, the 
-          number of customers it serves, and the number of employees it has. Make sure to mention any key 
-          clients or notable customers. If there are any client testimonials, include them as well. Identify
-            the key people in the management team and list their roles. Lastly, check for any case studies, 
-            brochures, or OEM details, and include a rating or review if available.""",
+                "content": """Please extract the relevant details about the company from the following
+                information. Focus on the company's name, email address, contact number, and physical address. Identify the
+                various locations where the company has offices. List the categories of services offered, along with
+                any specific products the company provides. Also, extract the types of industries the company serves.
+                Include details about the company’s experience, such as how long it has been in business, the
+                number of customers it serves, and the number of employees it has. Make sure to mention any key
+                clients or notable customers. If there are any client testimonials, include them as well. Identify
+                the key people in the management team and list their roles. Lastly, check for any case studies,
+                brochures, or OEM details, and include a rating or review if available.""",
             },
             {
                 "role": "user",
-                "content": f"Here is scrapped data of the companies web site: \n\n{result.markdown_v2.raw_markdown}",
+                "content": f"Here is scrapped data of the companies web site: \n\n{context_budget.compress(page.markdown, budget)}",
             },
         ],
-        response_format=CompanyDetails,
-        temperature=0.8,
+        response_format=remaining_details_model(frozenset(known)),
+        temperature=temperature,
     )
-    scrapped_links = await asyncio.to_thread(
-        client.beta.chat.completions.parse,
+    return known, request
+
+
+def complete_details(details, known):
+    """The LLM's fields plus the locally found ones, in CompanyDetails field order."""
+    details = {**details, **known}
+    return {name: details[name] for name in CompanyDetails.model_fields}
+
+
+async def extract_details(page, temperature):
+    """Extracts CompanyDetails from a crawled page as a dict."""
+    known, request = extraction_request(page, temperature)
+    details = await llm_cache.complete(async_client, **request)
+    return complete_details(details.model_dump(), known)
+
+
+async def limited(call):
+    """Awaits an LLM call while holding one llm_semaphore slot."""
+    async with llm_semaphore:
+        return await call
+
+
+async def fetch_home(crawler, url):
+    """Returns the home page and its internal links ({"href", "text"} dicts)."""
+    result = await page_cache.fetch(crawler, url, config)
+    internal_links = []
+    if result.success:
+        internal_links = result.links.get("internal", [])
+
+        for links in internal_links:
+            links.pop("title", None)
+            links.pop("base_domain", None)
+    return result, internal_links
+
+
+def llm_links_call(internal_links):
+    """The LLM's MeaningFullLinks pick from a home page's internal links (a coroutine)."""
+    return llm_cache.complete(
+        async_client,
         model="gpt-4o",
         messages=[
             {
@@ -181,90 +261,190 @@ async def home_scrape(url):
         temperature=0.9,
     )
 
-    content = completion.choices[0].message.parsed.model_dump()
 
-    main_messages.append({"role": "user", "content": f"{content}"})
+async def home_scrape(url, records):
+    async with crawler_pool.lease() as crawler:
+        result, internal_links = await fetch_home(crawler, url)
+    if not result.success:
+        # Fail before any LLM call, so the domain is saved as failed and retried.
+        raise ValueError("home page crawl failed")
+
+    details_call = limited(extract_details(result, temperature=0.8))
+    # The LLM only picks the links when the ranker is unsure, or when recording fixtures.
+    sorted_links, confidence = select_links(internal_links, base_url=url)
+    if confidence >= LINK_CONFIDENCE and not LINK_FIXTURES_PATH:
+        details = await details_call
+    else:
+        # Each call takes its own llm_semaphore slot, so together they count as two.
+        links_call = limited(llm_links_call(internal_links))
+        details, scrapped_links = await asyncio.gather(details_call, links_call)
+        llm_links = scrapped_links.model_dump()
+        if LINK_FIXTURES_PATH:
+            save_fixture(LINK_FIXTURES_PATH, url, internal_links, llm_links, sorted_links)
+        if confidence < LINK_CONFIDENCE:
+            sorted_links = llm_links
+
+    records.append(details)
 
-    sorted_links = scrapped_links.choices[0].message.parsed.model_dump()
     json_sorted_links = json.dumps(sorted_links)
 
     return json_sorted_links
 
 
-async def mini_links_scrape(links):
-    async with AsyncWebCrawler() as crawler:
-        web_urls = links.get("web_urls")
-        doc_urls = links.get("doc_urls")
-
-        for link in web_urls:
-            result = await crawler.arun(url=link, config=config)
-            completion = await asyncio.to_thread(
-                client.beta.chat.completions.parse,
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """Please extract the relevant details about the company from the following 
-                        information. Focus on the company's name, email address, contact number, and physical address. Identify the 
-                        various locations where the company has offices. List the categories of services offered, along with 
-                        any specific products the company provides. Also, extract the types of industries the company serves.
-                        Include details about the company’s experience, such as how long it has been in business, the 
-                        number of customers it serves, and the number of employees it has. Make sure to mention any key 
-                        clients or notable customers. If there are any client testimonials, include them as well. Identify
-                        the key people in the management team and list their roles. Lastly, check for any case studies, 
-                        brochures, or OEM details, and include a rating or review if available.""",
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Here is scrapped data of the companies web site: \n\n{result.markdown_v2}",
-                    },
-                ],
-                response_format=CompanyDetails,
-                temperature=0.9,
-            )
-            content = completion.choices[0].message.parsed.model_dump()
-            main_messages.append({"role": "user", "content": f"{content}"})
-
-        # for link in doc_urls:
-        #     result = await crawler.arun(url=link, config=config)
-        #     completion = await asyncio.to_thread(
-        #         client.chat.completions.create,
-        #         model="gpt-4o-mini",
-        #         messages=[
-        #             {
-        #                 "role": "system",
-        #                 "content": """On the basis given content, you have to extract the only
-        #                 meaningful information about the company. The content provided you is the scrapped content
-        #                 from the company's site and in markdown format""",
-        #             },
-        #             {
-        #                 "role": "user",
-        #                 "content": f"Here is scrapped data of the companies web site: \n\n{result.markdown_v2.raw_markdown}",
-        #             },
-        #         ],
-        #         max_tokens=500,
-        #     )
-        #     content = completion.choices[0].message.content
-        #     main_messages.append({"role": "user", "content": f"{content}"})
+async def fetch_link(crawler, link):
+    """Crawls one sub-page; None if the crawl failed."""
+    async with crawl_semaphore:
+        result = await page_cache.fetch(crawler, link, config)
+    if not result.success:
+        print(f"Skipping {link}: crawl failed")
+        return None
+    return result
+
+
+async def fetch_doc(link):
+    """Downloads and reads one document as a page; None if unreadable."""
+    async with crawl_semaphore:
+        text = await doc_ingestor.ingest(link)
+    if not text:
+        return None
+    return CachedPage(url=link, success=True, markdown=text, document=True)
+
+
+async def extract_link(crawler, link):
+    """Crawls one sub-page and extracts the company details from it; None if the crawl failed."""
+    page = await fetch_link(crawler, link)
+    if page is None:
+        return None
+    async with llm_semaphore:
+        return await extract_details(page, temperature=0.9)
+
+
+async def extract_doc(link):
+    """Downloads and reads one document and extracts the company details from it; None if unreadable."""
+    page = await fetch_doc(link)
+    if page is None:
+        return None
+    async with llm_semaphore:
+        return await extract_details(page, temperature=0.9)
+
+
+async def mini_links_scrape(links, records):
+    async with crawler_pool.lease() as crawler:
+        web_urls = links.get("web_urls") or []
+        doc_urls = links.get("doc_urls") or []
+
+        # gather keeps the results in link order, so records comes out the same
+        # however the crawls and extractions interleave.
+        results = await asyncio.gather(
+            *(extract_link(crawler, link) for link in web_urls),
+            *(extract_doc(link) for link in doc_urls),
+            return_exceptions=True,
+        )
+        for link, content in zip(web_urls + doc_urls, results):
+            if isinstance(content, Exception):
+                print(f"Skipping {link}: {content!r}")
+                continue
+            if content is None:
+                continue
+            records.append(content)
 
         return True
 
 
-async def main(url: str):
-    related_links = await home_scrape(url=url)
-    url_scraped_true = await mini_links_scrape(links=json.loads(related_links))
-    if url_scraped_true:
-        completion = client.beta.chat.completions.parse(
-            model="gpt-4o",
-            messages=main_messages,
-            response_format=CompanyDetails,
-            temperature=0.5,
+async def resolve_conflicts(conflicts):
+    """
+    Asks a small model to choose between tied values of scalar fields; answers that
+    are not one of the candidates are ignored.
+    """
+    async with llm_semaphore:
+        choice = await llm_cache.complete(
+            async_client,
+            model="gpt-4o-mini",
+            messages=[
+                {
+                    "role": "system",
+                    "content": """Different pages of a company's website gave different values for these
+                    fields. For each field, pick the value most likely to be correct and copy it exactly
+                    from its candidates.""",
+                },
+                {"role": "user", "content": json.dumps(conflicts, ensure_ascii=False)},
+            ],
+            response_format=remaining_details_model(frozenset(CompanyDetails.model_fields) - set(conflicts)),
+            temperature=0,
+        )
+    choice = choice.model_dump()
+    return {field: choice[field] for field, candidates in conflicts.items() if choice[field] in candidates}
+
+
+async def merge_details(records, resolve=RESOLVE_CONFLICTS):
+    merged, conflicts = merge_records(records, list(CompanyDetails.model_fields), LIST_FIELDS)
+    if conflicts and resolve:
+        merged.update(await resolve_conflicts(conflicts))
+    return CompanyDetails(**merged).model_dump()
+
+
+async def extract_company(url, timings=None):
+    """
+    Runs home_scrape -> mini_links_scrape -> merge for one site and returns its
+    CompanyDetails as a dict. Seconds spent per stage are stored in `timings`
+    under "home", "links" and "merge" when a dict is passed.
+    """
+    timings = {} if timings is None else timings
+    records = []
+
+    started = time.perf_counter()
+    related_links = await home_scrape(url, records)
+    timings["home"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    await mini_links_scrape(json.loads(related_links), records)
+    timings["links"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    details = await merge_details(records)
+    timings["merge"] = time.perf_counter() - started
+    return details
+
+
+async def collect_pages(url):
+    """
+    Crawls a site for offline batch extraction: the home page, then the sub-pages
+    and documents picked by link_ranker, or by the LLM when the ranker is unsure, as
+    in home_scrape. That link choice is the only LLM call made. Returns the pages
+    read, home page first, in the order extract_company would extract them. Raises
+    ValueError, as home_scrape does, when the home page crawl fails.
+    """
+    async with crawler_pool.lease() as crawler:
+        home, internal_links = await fetch_home(crawler, url)
+        if not home.success:
+            raise ValueError("home page crawl failed")
+        links, confidence = select_links(internal_links, base_url=url)
+        if confidence < LINK_CONFIDENCE:
+            async with llm_semaphore:
+                links = (await llm_links_call(internal_links)).model_dump()
+        pages = await asyncio.gather(
+            *(fetch_link(crawler, link) for link in links["web_urls"]),
+            *(fetch_doc(link) for link in links["doc_urls"]),
+            return_exceptions=True,
         )
-        event = completion.choices[0].message.parsed.model_dump()
-        company_details_json = json.dumps(event, indent=4)
-        print(company_details_json)
-        print("\n\n", json.dumps(main_messages), "\n\n")
-        return company_details_json
+    return [home] + [page for page in pages if page is not None and not isinstance(page, Exception)]
+
+
+async def main(url: str):
+    try:
+        event = await extract_company(url)
+    finally:
+        page_cache.report()
+        context_budget.report()
+        llm_cache.report()
+        contact_extractor.report()
+        doc_ingestor.report()
+        crawler_pool.report()
+        await crawler_pool.close()
+        doc_ingestor.close()
+    company_details_json = json.dumps(event, indent=4)
+    print(company_details_json)
+    return company_details_json
 
 
 if __name__ == "__main__":
@@ -1,9 +1,21 @@
 # scrape the all possile html content, that able to load on the browser and also depth crawling.
 
-from urllib.parse import urljoin, urlparse
+import time
 
-from bs4 import BeautifulSoup
+from dedup import NearDuplicateIndex, canonical_url
+from extractor import extract_page
 from playwright.sync_api import sync_playwright
+from politeness import HostScheduler
+from readiness import wait_until_ready
+from resource_blocking import ResourceBlocker, format_stats
+from sinks import open_sink
+
+# Requests to abort while crawling, see resource_blocking.PROFILES.
+BLOCK_PROFILE = "text_only"
+# Page loads per second allowed against a single host.
+PAGES_PER_SECOND = 1.0
+# Reloads of a page answered with 429/503, each after the host's backoff, before it is skipped.
+THROTTLE_RETRIES = 2
 
 
 def clean_text_per_line(text):
@@ -18,61 +30,96 @@ def clean_text_per_line(text):
         return ""
 
 
-def extract_internal_links(url, html_content):
-    soup = BeautifulSoup(html_content, "html.parser")
-    internal_links = set()
-    base_domain = urlparse(url).netloc
-
-    for anchor in soup.find_all("a", href=True):
-        link = anchor["href"]
-        full_link = urljoin(url, link)
-        if urlparse(full_link).netloc == base_domain:
-            internal_links.add(full_link)
-
-    for iframe in soup.find_all("iframe", src=True):
-        link = iframe["src"]
-        full_link = urljoin(url, link)
-        if urlparse(full_link).netloc == base_domain:
-            internal_links.add(full_link)
-
-    return list(internal_links)
-
-
-def crawl_page(page, url, visited, max_depth, current_depth):
+def crawl_page(
+    page, url, visited, max_depth, current_depth, blocker=None, seen=None, scheduler=None
+):
+    """
+    Depth-first crawl from url that yields one record per page (url, depth, cleaned
+    text, internal links, timings) as soon as it is extracted.
+    """
     if url in visited or current_depth > max_depth:
         return
     visited.add(url)
-    print(f"\nCrawling URL: {url} (Depth: {current_depth})")
+    if scheduler is not None and not scheduler.allowed(url):
+        print(f"robots.txt disallows {url}, skipping.")
+        return
 
-    try:
-        page.goto(url, timeout=30000)
-        page.wait_for_load_state("networkidle", timeout=30000)
-    except Exception as e:
-        print(f"Error loading {url}: {e}")
+    print(f"\nCrawling URL: {url} (Depth: {current_depth})")
+    for _ in range(THROTTLE_RETRIES + 1):
+        if scheduler is not None:
+            # Also waits out the backoff after a throttled attempt.
+            scheduler.wait(url)
+        started = time.perf_counter()
+        try:
+            response = page.goto(url, wait_until="domcontentloaded", timeout=30000)
+        except Exception as e:
+            print(f"Error loading {url}: {e}")
+            if blocker is not None:
+                blocker.take_stats()
+            return
+        if response is None or scheduler is None:
+            break
+        if not scheduler.record(url, response.status, response.headers.get("retry-after")):
+            break
+        print(f"{url} answered {response.status}, backing off.")
+    else:
+        # The error page is not the page's content, so it is not recorded.
+        print(f"Skipping {url}: still throttled after {THROTTLE_RETRIES} retries.")
+        if blocker is not None:
+            blocker.take_stats()
         return
+    loaded = time.perf_counter()
+
+    # Wait until the page text stops changing (or the hard cap is hit).
+    ready = wait_until_ready(page)
+    print(f"Page ready after {ready['elapsed_ms']} ms ({ready['signal']}).")
+    resources = blocker.take_stats() if blocker is not None else None
+    if resources is not None:
+        print(f"Resources for {url}: {format_stats(resources)}")
+    settled = time.perf_counter()
 
     # Get the full HTML content of the page.
     html_content = page.content()
 
-    # Use BeautifulSoup to extract the raw text.
-    soup = BeautifulSoup(html_content, "html.parser")
-    raw_text = soup.get_text(separator="\n")
+    # Parse once for both the raw text and the internal links.
+    raw_text, internal_links = extract_page(url, html_content)
 
     # Clean the text on a per-line basis.
     cleaned_text = clean_text_per_line(raw_text)
-    print(f"Extracted Text Content from {url}:\n{cleaned_text}\n")
+    extracted = time.perf_counter()
 
-    if current_depth >= max_depth:
-        return
+    # Skip pages whose text nearly matches one already crawled (e.g. listing clones).
+    if seen is not None and cleaned_text:
+        duplicate_of = seen.check(cleaned_text, url)
+        if duplicate_of is not None:
+            print(f"Skipping {url}: near-duplicate of {duplicate_of}.")
+            return
 
-    # Extract and report the number of internal links.
-    internal_links = extract_internal_links(url, html_content)
+    # Report the number of internal links.
     print(f"Found {len(internal_links)} internal link(s) on {url}.")
+    yield {
+        "url": url,
+        "depth": current_depth,
+        "text": cleaned_text,
+        "links": internal_links,
+        "ready_signal": ready["signal"],
+        "resources": resources,
+        "timings": {
+            "load_ms": round((loaded - started) * 1000),
+            "ready_ms": round((settled - loaded) * 1000),
+            "extract_ms": round((extracted - settled) * 1000),
+        },
+    }
+
+    if current_depth >= max_depth:
+        return
 
     # Recursively crawl each internal link if not already visited.
     for link in internal_links:
         if link not in visited:
-            crawl_page(page, link, visited, max_depth, current_depth + 1)
+            yield from crawl_page(
+                page, link, visited, max_depth, current_depth + 1, blocker, seen, scheduler
+            )
 
 
 def main():
@@ -82,6 +129,7 @@ def main():
     except ValueError:
         print("Invalid depth value. Using default depth of 2.")
         max_depth = 2
+    output_path = input("Enter output file (.jsonl, .jsonl.gz or .sqlite): ").strip() or "crawl.jsonl"
 
     visited = set()
 
@@ -91,7 +139,25 @@ def main():
         context = browser.new_context()
         page = context.new_page()
 
-        crawl_page(page, start_url, visited, max_depth, current_depth=0)
+        # Skip media, fonts and trackers; only text and links are kept.
+        blocker = ResourceBlocker(BLOCK_PROFILE)
+        blocker.attach_sync(page)
+
+        # Stream every crawled page into the output sink.
+        records = crawl_page(
+            page,
+            canonical_url(start_url),
+            visited,
+            max_depth,
+            current_depth=0,
+            blocker=blocker,
+            seen=NearDuplicateIndex(),
+            scheduler=HostScheduler(rate=PAGES_PER_SECOND, burst=1),
+        )
+        with open_sink(output_path) as sink:
+            for record in records:
+                sink.write(record)
+        print(f"\nCrawled {sink.count} page(s) into {output_path}.")
 
         browser.close()
 
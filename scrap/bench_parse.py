@@ -0,0 +1,78 @@
+# benchmark for listing parsing throughput: parsing in the i/o threads (GIL-bound) versus
+# the process-pool ParsePipeline at increasing worker counts.
+#
+#   python bench_parse.py --pages 400 --cards 12
+
+import argparse
+import concurrent.futures
+import os
+import time
+
+from listing_parser import parse_product_list
+from parse_pipeline import ParsePipeline
+
+
+def make_page(page, cards):
+    """A synthetic product_list fragment shaped like the p2pconnect.in cards."""
+    items = []
+    for i in range(cards):
+        n = page * cards + i
+        items.append(
+            f"""<div class="col-md-4 product-box">
+                <div class="card">
+                    <h4>Vendor {n} Technologies Pvt Ltd</h4>
+                    <p>Product: Suite {n} for cloud ERP and analytics</p>
+                    <p>OEM</p><p>Microsoft</p>
+                    <p>Location: India</p>
+                    <p>{"Certified partner delivering implementation and support. " * 8}</p>
+                    <a href="/Home/vendor_details/{n}">View details</a>
+                    <a href="/Home/enquiry/{n}">Enquire</a>
+                </div>
+            </div>"""
+        )
+    return f'<div class="row">{"".join(items)}</div>'
+
+
+def bench_threads(pages, threads):
+    started = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(parse_product_list, pages))
+    return time.perf_counter() - started
+
+
+def bench_pipeline(pages, workers):
+    pipeline = ParsePipeline(parse_product_list, workers=workers)
+    pipeline.parse(pages[0])  # start the worker processes outside the timing
+    parsed = []
+    started = time.perf_counter()
+    for html in pages:
+        pipeline.submit(html, parsed.append)
+    # close() waits for every parse and runs the remaining handlers.
+    pipeline.close()
+    elapsed = time.perf_counter() - started
+    assert len(parsed) == len(pages)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark listing parse throughput.")
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--cards", type=int, default=12)
+    parser.add_argument("--threads", type=int, default=10, help="I/O threads in the baseline")
+    args = parser.parse_args()
+
+    pages = [make_page(p, args.cards) for p in range(args.pages)]
+    cpus = os.cpu_count() or 1
+    print(f"{args.pages} page(s) x {args.cards} card(s), {cpus} CPU(s)\n")
+
+    elapsed = bench_threads(pages, args.threads)
+    print(f"{'in I/O threads (' + str(args.threads) + ')':<24}{args.pages / elapsed:>10.1f} pages/s")
+
+    workers = sorted({1, 2, 4, 8, 16, cpus} & set(range(1, cpus + 1)))
+    for count in workers:
+        elapsed = bench_pipeline(pages, count)
+        print(f"{'process pool (' + str(count) + ')':<24}{args.pages / elapsed:>10.1f} pages/s")
+
+
+if __name__ == "__main__":
+    main()
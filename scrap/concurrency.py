@@ -0,0 +1,112 @@
+# adaptive in-flight request limit for the thread-pool scrapers (AIMD): grow by one
+# while latency and errors stay healthy, halve on timeouts, 5xx or 429.
+
+import math
+import threading
+import time
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class AIMDController:
+    """
+    Caps the number of requests in flight across all worker threads.
+
+    After every `window` healthy completions the limit grows by one, as long as the
+    window's p95 latency is under the target and its error rate under max_error_rate.
+    The target is latency_target seconds, or twice the best window p95 seen so far
+    when it is None. An overload (timeout, connection error, 5xx, 429) multiplies
+    the limit by decrease_factor, at most once per round of requests: overloads
+    from requests started before the last decrease are ignored.
+
+    on_limit(limit), when given, is called with the initial limit and every change,
+    so request pacing elsewhere can follow the window.
+    """
+
+    def __init__(
+        self,
+        initial=4,
+        min_limit=1,
+        max_limit=32,
+        window=20,
+        latency_target=None,
+        max_error_rate=0.05,
+        decrease_factor=0.5,
+        log=print,
+        on_limit=None,
+    ):
+        self.limit = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.window = window
+        self.latency_target = latency_target
+        self.max_error_rate = max_error_rate
+        self.decrease_factor = decrease_factor
+        self.log = log
+        self.on_limit = on_limit
+        self.in_flight = 0
+        self.history = [(time.time(), initial)]
+        self._best_p95 = None
+        self._latencies = []
+        self._errors = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+        if on_limit:
+            on_limit(initial)
+
+    def acquire(self):
+        """Blocks until a slot is free; returns the start time to pass to release()."""
+        with self._cond:
+            while self.in_flight >= self.limit:
+                self._cond.wait()
+            self.in_flight += 1
+        return time.monotonic()
+
+    def release(self, started, error=False, overloaded=False):
+        """
+        Frees the slot taken at `started`. `error` marks a failed request, and
+        `overloaded` one that signals server pressure (it also counts as an error).
+        """
+        latency = time.monotonic() - started
+        with self._cond:
+            self.in_flight -= 1
+            self._latencies.append(latency)
+            self._errors += error or overloaded
+
+            if overloaded and started >= self._last_decrease:
+                self._set_limit(
+                    max(self.min_limit, math.floor(self.limit * self.decrease_factor)),
+                    "overload",
+                )
+                self._last_decrease = time.monotonic()
+                self._reset_window()
+            elif len(self._latencies) >= self.window:
+                p95 = percentile(self._latencies, 0.95)
+                error_rate = self._errors / len(self._latencies)
+                if self._best_p95 is None or p95 < self._best_p95:
+                    self._best_p95 = p95
+                target = self.latency_target or 2 * self._best_p95
+                if p95 <= target and error_rate <= self.max_error_rate:
+                    self._set_limit(
+                        min(self.max_limit, self.limit + 1),
+                        f"p95 {p95:.2f}s, errors {error_rate:.0%}",
+                    )
+                self._reset_window()
+            self._cond.notify_all()
+
+    def _reset_window(self):
+        self._latencies = []
+        self._errors = 0
+
+    def _set_limit(self, limit, reason):
+        if limit == self.limit:
+            return
+        if self.log:
+            self.log(f"Concurrency {self.limit} -> {limit} ({reason})")
+        self.limit = limit
+        self.history.append((time.time(), limit))
+        if self.on_limit:
+            self.on_limit(limit)
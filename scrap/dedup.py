@@ -0,0 +1,122 @@
+# url canonicalization and near-duplicate content detection for the scrap crawlers, so
+# tracking/session variants of a url and cloned pages are only crawled once.
+
+import hashlib
+import re
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+# Tracking and click-id query parameters; they never change the page content.
+# Generic names such as ref or sid are kept, since many sites use them to pick content.
+TRACKING_PARAMS = {
+    "gclid",
+    "fbclid",
+    "msclkid",
+    "dclid",
+    "yclid",
+    "mc_cid",
+    "mc_eid",
+    "_ga",
+    "_gl",
+    "_hsenc",
+    "_hsmi",
+}
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+WORD_RE = re.compile(r"\w+")
+
+
+def canonical_url(url):
+    """
+    Normalizes a URL before it is added to the frontier: lower-cased scheme and host,
+    no default port, fragment, utm_*/click-id parameters or ;jsessionid path
+    parameter, sorted query and no trailing slash (except for the root path).
+    A URL that cannot be parsed (bad port, broken IPv6 host) is returned unchanged.
+    """
+    url = url.strip()
+    try:
+        parsed = urlparse(url)
+        port = parsed.port
+    except ValueError:
+        return url
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or "").lower()
+    if ":" in host:
+        # hostname drops the brackets around an IPv6 address.
+        host = f"[{host}]"
+    netloc = host
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{port}"
+
+    path = re.sub(r";jsessionid=[^/?]*", "", parsed.path, flags=re.IGNORECASE)
+    path = re.sub(r"/{2,}", "/", path)
+    if len(path) > 1:
+        path = path.rstrip("/")
+    path = path or "/"
+
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    )
+
+    return urlunparse((scheme, netloc, path, "", urlencode(query), ""))
+
+
+def simhash(text, shingle_size=3):
+    """
+    64-bit SimHash of text over word shingles. Near-identical texts produce
+    fingerprints a few bits apart.
+    """
+    words = WORD_RE.findall(text.lower())
+    if len(words) < shingle_size:
+        shingles = [" ".join(words)] if words else []
+    else:
+        shingles = [" ".join(words[i : i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+
+    weights = [0] * 64
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if value >> bit & 1 else -1
+
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+class NearDuplicateIndex:
+    """
+    Remembers SimHash fingerprints of crawled pages and finds earlier pages within
+    max_distance bits. Fingerprints are split into max_distance + 1 bands, so any
+    near-duplicate shares at least one band exactly and lookups stay cheap.
+    """
+
+    def __init__(self, max_distance=3):
+        self.max_distance = max_distance
+        self.band_bits = 64 // (max_distance + 1)
+        self.bands = [{} for _ in range(max_distance + 1)]
+
+    def _band_keys(self, fingerprint):
+        mask = (1 << self.band_bits) - 1
+        return [(fingerprint >> (i * self.band_bits)) & mask for i in range(len(self.bands))]
+
+    def find(self, fingerprint):
+        """Returns the URL of a near-duplicate page already seen, or None."""
+        for band, key in zip(self.bands, self._band_keys(fingerprint)):
+            for other, url in band.get(key, ()):
+                if bin(fingerprint ^ other).count("1") <= self.max_distance:
+                    return url
+        return None
+
+    def add(self, fingerprint, url):
+        for band, key in zip(self.bands, self._band_keys(fingerprint)):
+            band.setdefault(key, []).append((fingerprint, url))
+
+    def check(self, text, url):
+        """
+        Fingerprints text and returns the URL of a near-duplicate seen earlier, or
+        None after recording this page as new.
+        """
+        fingerprint = simhash(text)
+        duplicate_of = self.find(fingerprint)
+        if duplicate_of is None:
+            self.add(fingerprint, url)
+        return duplicate_of
@@ -0,0 +1,85 @@
+# single-pass html extraction shared by the scrap crawlers: one parse yields both the
+# page text and its same-domain links.
+
+from urllib.parse import urljoin, urlparse
+
+from bs4 import BeautifulSoup
+from dedup import canonical_url
+
+try:
+    import lxml.html
+except ImportError:  # pragma: no cover - lxml is in requirements.txt, bs4 is the fallback
+    lxml = None
+
+# Elements whose content is never visible page text.
+SKIP_TAGS = {"script", "style", "noscript", "template"}
+LINK_ATTRS = {"a": "href", "iframe": "src"}
+
+
+def extract_internal_links(url, hrefs):
+    """
+    Resolves raw href/src values against url and keeps the canonical form of those on
+    the same domain, so url variants collapse before they reach the frontier. Hosts
+    are compared in canonical form, so Example.com:443 is the same site as example.com.
+    """
+    internal_links = set()
+    base_domain = urlparse(canonical_url(url)).netloc
+
+    for link in hrefs:
+        try:
+            full_link = canonical_url(urljoin(url, link.strip()))
+            netloc = urlparse(full_link).netloc
+        except ValueError:
+            # Malformed href (e.g. an unclosed IPv6 bracket); one bad link must not end the crawl.
+            continue
+        if netloc == base_domain:
+            internal_links.add(full_link)
+
+    return list(internal_links)
+
+
+def _extract_lxml(html_content):
+    root = lxml.html.document_fromstring(html_content)
+    hrefs = []
+    for element in root.iter(*LINK_ATTRS):
+        value = element.get(LINK_ATTRS[element.tag])
+        if value:
+            hrefs.append(value)
+
+    # Drop skipped elements with everything under them (their tail text stays), as the
+    # bs4 fallback does with decompose(), so both backends return the same text.
+    for element in list(root.iter(*SKIP_TAGS)):
+        element.drop_tree()
+
+    # itertext yields text and tails in document order and leaves out comment text.
+    return "\n".join(root.itertext()), hrefs
+
+
+def _extract_bs4(html_content):
+    soup = BeautifulSoup(html_content, "html.parser")
+    hrefs = [a["href"] for a in soup.find_all("a", href=True)]
+    hrefs += [iframe["src"] for iframe in soup.find_all("iframe", src=True)]
+
+    for element in soup.find_all(SKIP_TAGS):
+        element.decompose()
+
+    return soup.get_text(separator="\n"), hrefs
+
+
+def extract_page(url, html_content, backend=None):
+    """
+    Parses html_content once and returns (raw_text, internal_links).
+
+    Uses lxml when available and falls back to BeautifulSoup if lxml is missing or
+    cannot parse the document. Pass backend="bs4" to force the fallback.
+    """
+    text, hrefs = None, None
+    if backend != "bs4" and lxml is not None:
+        try:
+            text, hrefs = _extract_lxml(html_content)
+        except (ValueError, lxml.etree.ParserError):
+            pass
+    if text is None:
+        text, hrefs = _extract_bs4(html_content)
+
+    return text, extract_internal_links(url, hrefs)
@@ -0,0 +1,89 @@
+# pooled keep-alive http transport for the api scrapers: one requests.Session per worker
+# thread so tcp/tls connections are reused across requests instead of a fresh handshake
+# every time.
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class PooledTransport:
+    """
+    Hands each thread its own keep-alive Session (Sessions are not thread-safe) with a
+    connection pool of pool_size, default timeouts and retry-with-backoff on connection
+    errors and 500/502/504. 429/503 are left to the caller's rate limiter.
+    """
+
+    def __init__(self, pool_size=10, timeout=(5, 30), retries=3, backoff_factor=0.5):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(500, 502, 504),
+            allowed_methods=frozenset({"GET", "POST"}),
+            raise_on_status=False,
+            respect_retry_after_header=False,
+        )
+        self._local = threading.local()
+        self._sessions = []
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=self.pool_size,
+                pool_maxsize=self.pool_size,
+                max_retries=self.retry,
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._local.session = session
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def connection_stats(self):
+        """
+        Requests sent and connections opened across all sessions, read from urllib3's
+        pool counters. `reused` is how many requests went over an existing connection.
+        """
+        requests_sent = connections = 0
+        with self._lock:
+            sessions = list(self._sessions)
+        for session in sessions:
+            # The same adapter is mounted for http:// and https://, count it once.
+            for adapter in {id(a): a for a in session.adapters.values()}.values():
+                for pool in list(adapter.poolmanager.pools._container.values()):
+                    requests_sent += pool.num_requests
+                    connections += pool.num_connections
+        return {
+            "sessions": len(sessions),
+            "requests": requests_sent,
+            "connections": connections,
+            "reused": requests_sent - connections,
+        }
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions = []
@@ -0,0 +1,207 @@
+# sqlite-backed job ledger for the scrape_interception sweep, so a crashed or killed
+# run can resume without repeating the pages and probes it already finished.
+
+import json
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import urljoin
+
+from listing_parser import BASE_URL, is_navigational
+
+
+# Columns filled from parse_listing_card; listed_* are the values printed on the
+# card, as opposed to the filter combination it was found under.
+LISTING_FIELDS = ("vendor", "product", "listed_oem", "listed_location", "links")
+INSERT_LISTING = (
+    f"INSERT OR IGNORE INTO listings (key, category, location, oem, page, text, "
+    f"{', '.join(LISTING_FIELDS)}) VALUES ({', '.join('?' * (6 + len(LISTING_FIELDS)))})"
+)
+INSERT_MEMBERSHIP = "INSERT OR IGNORE INTO listing_combos VALUES (?, ?, ?, ?, ?)"
+# Stored in PRAGMA user_version. 2: listing keys are absolute, navigational links.
+LEDGER_VERSION = 2
+HASH_KEY_RE = re.compile(r"^[0-9a-f]{40}$")
+
+
+def migrate_key(key, links_json):
+    """
+    The current listing key for a row written by an older version: its first stored
+    navigational link, else its relative link made absolute. Text-hash keys are kept,
+    since the card markup they would now be hashed with was not stored.
+    """
+    for link in json.loads(links_json or "[]"):
+        if is_navigational(link) and not link.startswith(f"{BASE_URL}#"):
+            return link
+    if HASH_KEY_RE.match(key) or not is_navigational(key):
+        return key
+    return urljoin(BASE_URL, key)
+
+
+class JobStore:
+    """
+    Records every (category, location, oem, page) job as pending, done or failed,
+    the result of each coarse-filter probe, and the listings collected with their
+    structured fields, so they can be queried directly with SQL. A listing is
+    stored once, under the combination that found it first; listing_combos holds
+    every (category, location, oem) it was listed under. Writes are buffered and
+    committed in one transaction per `batch_size` updates; at most that many
+    finished jobs are redone after a crash.
+
+    Opening with reset=True starts a new sweep; otherwise the existing ledger is
+    loaded and finished work is skipped.
+    """
+
+    def __init__(self, path="sweep.sqlite", batch_size=50, reset=False):
+        self.path = path
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                category TEXT, location TEXT, oem TEXT, page INTEGER,
+                status TEXT NOT NULL,
+                has_next INTEGER,
+                error TEXT,
+                updated_at REAL,
+                PRIMARY KEY (category, location, oem, page)
+            );
+            CREATE TABLE IF NOT EXISTS probes (
+                category TEXT, location TEXT, oem TEXT,
+                found INTEGER NOT NULL,
+                PRIMARY KEY (category, location, oem)
+            );
+            CREATE TABLE IF NOT EXISTS listings (
+                key TEXT PRIMARY KEY,
+                category TEXT, location TEXT, oem TEXT, page INTEGER,
+                text TEXT
+            );
+            CREATE TABLE IF NOT EXISTS listing_combos (
+                key TEXT, category TEXT, location TEXT, oem TEXT, page INTEGER,
+                PRIMARY KEY (key, category, location, oem)
+            );
+            """
+        )
+        # Structured listing fields, added to ledgers created before they existed.
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(listings)")}
+        for column in LISTING_FIELDS:
+            if column not in columns:
+                self._db.execute(f"ALTER TABLE listings ADD COLUMN {column} TEXT")
+        if reset:
+            self._db.executescript(
+                "DELETE FROM jobs; DELETE FROM probes; DELETE FROM listings; DELETE FROM listing_combos;"
+            )
+        (version,) = self._db.execute("PRAGMA user_version").fetchone()
+        if version < LEDGER_VERSION:
+            self._migrate_keys()
+            self._db.execute(f"PRAGMA user_version = {LEDGER_VERSION}")
+        self._db.commit()
+
+        self._jobs = {
+            (category, location, oem, page): (status, bool(has_next))
+            for category, location, oem, page, status, has_next in self._db.execute(
+                "SELECT category, location, oem, page, status, has_next FROM jobs"
+            )
+        }
+        self._probes = {
+            (category, location, oem): bool(found)
+            for category, location, oem, found in self._db.execute("SELECT * FROM probes")
+        }
+        self._pending_writes = []
+
+    def _migrate_keys(self):
+        """Rewrites listing keys from older ledgers, so a resumed sweep recognises them."""
+        rows = self._db.execute("SELECT key, links FROM listings").fetchall()
+        for key, links in rows:
+            new_key = migrate_key(key, links)
+            if new_key == key:
+                continue
+            for table in ("listings", "listing_combos"):
+                self._db.execute(f"UPDATE OR IGNORE {table} SET key = ? WHERE key = ?", (new_key, key))
+                # Left behind when the new key already existed: a duplicate of that listing.
+                self._db.execute(f"DELETE FROM {table} WHERE key = ?", (key,))
+
+    # jobs
+
+    def page_status(self, combo, page):
+        """Returns (status, has_next) for a job, or None if it was never started."""
+        return self._jobs.get((*combo, page))
+
+    def _write(self, sql, params):
+        with self._lock:
+            self._pending_writes.append((sql, params))
+            if len(self._pending_writes) >= self.batch_size:
+                self._flush_locked()
+
+    def _set_job(self, combo, page, status, has_next=None, error=None):
+        self._jobs[(*combo, page)] = (status, bool(has_next))
+        self._write(
+            "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (*combo, page, status, has_next, error, time.time()),
+        )
+
+    def mark_pending(self, combo, page):
+        self._set_job(combo, page, "pending")
+
+    def mark_failed(self, combo, page, error):
+        self._set_job(combo, page, "failed", error=error)
+
+    def mark_done(self, combo, page, has_next, listings):
+        """Stores the page's listings (new or already seen) and marks the page done."""
+        for listing in listings:
+            self._write(INSERT_MEMBERSHIP, (listing["key"], *combo, page))
+            self._write(
+                INSERT_LISTING,
+                (
+                    listing["key"],
+                    *combo,
+                    page,
+                    listing["text"],
+                    listing.get("vendor", ""),
+                    listing.get("product", ""),
+                    listing.get("oem", ""),
+                    listing.get("location", ""),
+                    json.dumps(listing.get("links", [])),
+                ),
+            )
+        self._set_job(combo, page, "done", has_next=int(has_next))
+
+    # probes
+
+    def probe_result(self, key):
+        """Returns the stored probe outcome for a (category, location, oem) label, or None."""
+        return self._probes.get(key)
+
+    def record_probe(self, key, found):
+        self._probes[key] = found
+        self._write("INSERT OR REPLACE INTO probes VALUES (?, ?, ?, ?)", (*key, int(found)))
+
+    # listings
+
+    def listing_keys(self):
+        self.flush()
+        with self._lock:
+            return {key for (key,) in self._db.execute("SELECT key FROM listings")}
+
+    def summary(self):
+        counts = {}
+        for status, _ in list(self._jobs.values()):
+            counts[status] = counts.get(status, 0) + 1
+        return counts
+
+    def _flush_locked(self):
+        if not self._pending_writes:
+            return
+        with self._db:
+            for sql, params in self._pending_writes:
+                self._db.execute(sql, params)
+        self._pending_writes = []
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        self.flush()
+        self._db.close()
@@ -0,0 +1,123 @@
+# parsing of the p2pconnect.in `product_list` html into structured listing records. Kept
+# apart from scrape_interception so parser processes only import what they need.
+
+import hashlib
+import re
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+BASE_URL = "https://p2pconnect.in/"
+
+# Card labels mapped to the structured field they fill.
+FIELD_LABELS = {
+    "vendor": "vendor",
+    "company": "vendor",
+    "partner": "vendor",
+    "product": "product",
+    "solution": "product",
+    "oem": "oem",
+    "oems": "oem",
+    "location": "location",
+    "locations": "location",
+    "country": "location",
+    "city": "location",
+}
+# "Label: value" or "Label - value"; a bare hyphen ("Product-led growth") is not a label.
+LABEL_RE = re.compile(r"^\s*([A-Za-z]+)(?:\s*:|\s+[-\u2013](?=\s|$))\s*(.*)$")
+# Hrefs that do not lead anywhere; many cards share them, so they cannot identify a listing.
+NON_NAVIGATIONAL = ("#", "javascript:", "mailto:", "tel:")
+
+
+def is_navigational(href):
+    href = href.strip()
+    return bool(href) and not href.lower().startswith(NON_NAVIGATIONAL)
+
+
+def is_label(text):
+    """
+    True for label text: "OEM:", "Location -", a bare "Vendor", or a field label
+    with its value ("OEM: SAP"). A name with a tagline ("Acme - Cloud ERP") is not.
+    """
+    match = LABEL_RE.match(text)
+    if match:
+        return not match.group(2) or match.group(1).lower() in FIELD_LABELS
+    return text.strip().lower() in FIELD_LABELS
+
+
+def parse_listing_card(card):
+    """
+    Turns one listing card into typed fields: vendor, product, oem, location
+    and links, plus the card text. Labelled lines ("OEM: SAP", or a label
+    followed by its value on the next line) are used first; headings that are
+    not labels fill in vendor and product when no label names them.
+    """
+    text = card.get_text(separator="\n", strip=True)
+    lines = text.splitlines()
+    fields = {"vendor": "", "product": "", "oem": "", "location": ""}
+
+    for i, line in enumerate(lines):
+        match = LABEL_RE.match(line)
+        label, value = (match.group(1), match.group(2)) if match else (line, "")
+        field = FIELD_LABELS.get(label.strip().lower())
+        if field is None or fields[field]:
+            continue
+        if not value and i + 1 < len(lines):
+            value = lines[i + 1]
+        fields[field] = value.strip()
+
+    # Cards often bold their labels ("<strong>Location:</strong> India"), so headings
+    # that are labels, or that are already a field's value, are not names.
+    used = {value for value in fields.values() if value}
+    headings = [
+        heading
+        for heading in (
+            h.get_text(" ", strip=True) for h in card.find_all(["h1", "h2", "h3", "h4", "h5", "h6", "strong"])
+        )
+        if heading and not is_label(heading) and heading not in used
+    ]
+    for field in ("vendor", "product"):
+        if not fields[field] and headings:
+            fields[field] = headings.pop(0)
+
+    hrefs = (a["href"] for a in card.find_all("a", href=True))
+    links = list(dict.fromkeys(urljoin(BASE_URL, href) for href in hrefs if is_navigational(href)))
+    return {**fields, "links": links, "text": text}
+
+
+def listing_key(card, listing):
+    """
+    The card's first navigational link, or else a hash of its hrefs and text, so
+    cards whose only links are "#" or "javascript:void(0)" are not all one listing.
+    """
+    if listing["links"]:
+        return listing["links"][0]
+    hrefs = " ".join(a["href"] for a in card.find_all("a", href=True))
+    return hashlib.sha1(f"{hrefs}\n{' '.join(listing['text'].split())}".encode()).hexdigest()
+
+
+def parse_product_list(html_content):
+    """
+    Uses BeautifulSoup to parse the HTML snippet in the 'product_list'
+    field and returns one dict per listing card with its key, structured
+    fields (see parse_listing_card) and text. The key (see listing_key) is
+    the same for a listing under every filter combination.
+    """
+    soup = BeautifulSoup(html_content, "html.parser")
+
+    # Cards are the top-level elements, below any single wrapping container
+    # whose children all look alike (same tag and class).
+    cards = soup.find_all(recursive=False)
+    while len(cards) == 1:
+        children = cards[0].find_all(recursive=False)
+        if not children or len({(c.name, tuple(c.get("class") or ())) for c in children}) > 1:
+            break
+        cards = children
+
+    listings = []
+    for card in cards:
+        listing = parse_listing_card(card)
+        if not listing["text"]:
+            continue
+        listings.append({"key": listing_key(card, listing), **listing})
+    return listings
@@ -1,75 +1,221 @@
 # scrape the all possile html, that able to load on the browser and also depth crawling, uses shrink the
 # context to save the tokens and process data fast for chatbot etc.
 
+import asyncio
 import re
-from urllib.parse import urljoin, urlparse
+import time
 
-from bs4 import BeautifulSoup
-from playwright.sync_api import sync_playwright
+from dedup import NearDuplicateIndex, canonical_url
+from extractor import extract_page
+from playwright.async_api import async_playwright
+from politeness import HostScheduler
+from readiness import async_wait_until_ready
+from resource_blocking import ResourceBlocker, format_stats
+from sinks import open_sink
+
+# Requests to abort while crawling, see resource_blocking.PROFILES.
+BLOCK_PROFILE = "text_only"
+# Page loads per second allowed against a single host.
+PAGES_PER_SECOND = 2.0
+# Reloads of a page answered with 429/503, each after the host's backoff, before it is skipped.
+THROTTLE_RETRIES = 2
 
 
 def clean_text(text):
     return re.sub(r"\s+", " ", text).strip()
 
 
-def extract_internal_links(url, html_content):
-    soup = BeautifulSoup(html_content, "html.parser")
-    internal_links = set()
-    base_domain = urlparse(url).netloc
-
-    # Extract links from <a> tags
-    for anchor in soup.find_all("a", href=True):
-        link = anchor["href"]
-        full_link = urljoin(url, link)
-        if urlparse(full_link).netloc == base_domain:
-            internal_links.add(full_link)
-
-    # Optionally, extract links from <iframe> tags
-    for iframe in soup.find_all("iframe", src=True):
-        link = iframe["src"]
-        full_link = urljoin(url, link)
-        if urlparse(full_link).netloc == base_domain:
-            internal_links.add(full_link)
-
-    return list(internal_links)
-
+async def crawl_page(page, url, current_depth, max_depth, blocker=None, seen=None, scheduler=None):
+    """
+    Loads a single URL in the given tab and returns (record, links_to_follow). The
+    record holds the url, depth, cleaned text, internal links and timings; it is None
+    when the page failed to load, stayed throttled (429/503) after THROTTLE_RETRIES
+    reloads, or nearly duplicates one already crawled.
+    """
+    if scheduler is not None and not await scheduler.allowed_async(url):
+        print(f"robots.txt disallows {url}, skipping.")
+        return None, []
 
-def crawl_page(page, url, visited, max_depth, current_depth):
-    if url in visited or current_depth > max_depth:
-        return
-    visited.add(url)
     print(f"\nCrawling URL: {url} (Depth: {current_depth})")
-
-    try:
-        # Navigate to the URL and wait for the network to be idle
-        page.goto(url, timeout=30000)
-        page.wait_for_load_state("networkidle", timeout=30000)
-    except Exception as e:
-        print(f"Error loading {url}: {e}")
-        return
+    for _ in range(THROTTLE_RETRIES + 1):
+        if scheduler is not None:
+            # Also waits out the backoff after a throttled attempt.
+            await scheduler.wait_async(url)
+        started = time.perf_counter()
+        try:
+            # Navigate to the URL; readiness is decided below, not by networkidle
+            response = await page.goto(url, wait_until="domcontentloaded", timeout=30000)
+        except Exception as e:
+            print(f"Error loading {url}: {e}")
+            if blocker is not None:
+                blocker.take_stats()
+            return None, []
+        if response is None or scheduler is None:
+            break
+        if not scheduler.record(url, response.status, response.headers.get("retry-after")):
+            break
+        print(f"{url} answered {response.status}, backing off.")
+    else:
+        # The error page is not the page's content, so it is not recorded.
+        print(f"Skipping {url}: still throttled after {THROTTLE_RETRIES} retries.")
+        if blocker is not None:
+            blocker.take_stats()
+        return None, []
+    loaded = time.perf_counter()
+
+    # Wait until the page text stops changing (or the hard cap is hit)
+    ready = await async_wait_until_ready(page)
+    print(f"Page ready after {ready['elapsed_ms']} ms ({ready['signal']}).")
+    resources = blocker.take_stats() if blocker is not None else None
+    if resources is not None:
+        print(f"Resources for {url}: {format_stats(resources)}")
+    settled = time.perf_counter()
 
     # Get the full HTML content from the page
-    html_content = page.content()
+    html_content = await page.content()
 
-    # Use BeautifulSoup to extract the text from the HTML content
-    soup = BeautifulSoup(html_content, "html.parser")
-    raw_text = soup.get_text(separator="\n")
+    # Parse once for both the text and the internal links
+    raw_text, internal_links = extract_page(url, html_content)
 
     # Clean the text to remove weird spacing and ensure it's on one line (if needed)
     cleaned_text = clean_text(raw_text)
-    print(f"Extracted Text Content from {url}:\n{cleaned_text}\n")
+    extracted = time.perf_counter()
 
-    if current_depth >= max_depth:
-        return
+    # Skip pages whose text nearly matches one already crawled (e.g. listing clones)
+    if seen is not None and cleaned_text:
+        duplicate_of = seen.check(cleaned_text, url)
+        if duplicate_of is not None:
+            print(f"Skipping {url}: near-duplicate of {duplicate_of}.")
+            return None, []
 
-    # Extract and print the number of internal links found
-    internal_links = extract_internal_links(url, html_content)
+    # Print the number of internal links found
     print(f"Found {len(internal_links)} internal link(s) on {url}.")
+    record = {
+        "url": url,
+        "depth": current_depth,
+        "text": cleaned_text,
+        "links": internal_links,
+        "ready_signal": ready["signal"],
+        "resources": resources,
+        "timings": {
+            "load_ms": round((loaded - started) * 1000),
+            "ready_ms": round((settled - loaded) * 1000),
+            "extract_ms": round((extracted - settled) * 1000),
+        },
+    }
 
-    # Recursively crawl each internal link (if not visited)
-    for link in internal_links:
-        if link not in visited:
-            crawl_page(page, link, visited, max_depth, current_depth + 1)
+    if current_depth >= max_depth:
+        return record, []
+    return record, internal_links
+
+
+async def crawl_site(
+    context,
+    start_url,
+    max_depth,
+    concurrency=4,
+    block_profile=BLOCK_PROFILE,
+    buffer_size=100,
+    stats=None,
+):
+    """
+    Crawls breadth-first from start_url and yields a record per page as soon as it
+    is extracted. A shared frontier queue and visited set are drained by
+    `concurrency` browser tabs in parallel, so one slow page no longer blocks the
+    rest of the crawl. Each tab aborts the requests matched by block_profile, and
+    pages that nearly duplicate an earlier one are skipped. Page loads respect
+    robots.txt and are paced per host by a shared HostScheduler. At most buffer_size
+    records wait for the consumer; tabs pause when it falls behind.
+
+    If every tab dies (e.g. new_page() fails), the crawl stops with a RuntimeError
+    instead of waiting on the frontier forever. When `stats` is a dict it receives
+    the number of URLs "discovered", pages "crawled" (records yielded) and URLs
+    "skipped" (failed, throttled, disallowed or near-duplicate).
+    """
+    stats = {} if stats is None else stats
+    stats.update(discovered=1, crawled=0, skipped=0)
+    start_url = canonical_url(start_url)
+    visited = {start_url}
+    seen = NearDuplicateIndex()
+    scheduler = HostScheduler(rate=PAGES_PER_SECOND, burst=concurrency)
+    frontier = asyncio.Queue()
+    frontier.put_nowait((start_url, 0))
+    records = asyncio.Queue(maxsize=buffer_size)
+
+    async def worker():
+        page = await context.new_page()
+        try:
+            blocker = ResourceBlocker(block_profile)
+            await blocker.attach_async(page)
+            while True:
+                url, depth = await frontier.get()
+                try:
+                    record, links = await crawl_page(
+                        page, url, depth, max_depth, blocker, seen, scheduler
+                    )
+                    for link in links:
+                        # Mark as visited on insertion so no two tabs pick up the same URL.
+                        if link not in visited:
+                            visited.add(link)
+                            stats["discovered"] += 1
+                            frontier.put_nowait((link, depth + 1))
+                    if record is None:
+                        stats["skipped"] += 1
+                    else:
+                        stats["crawled"] += 1
+                        await records.put(record)
+                except Exception as e:
+                    stats["skipped"] += 1
+                    print(f"Error crawling {url}: {e}")
+                finally:
+                    frontier.task_done()
+        finally:
+            await page.close()
+
+    async def finish():
+        joined = asyncio.ensure_future(frontier.join())
+        waiting = {joined, *workers}
+        while not joined.done():
+            _, waiting = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+            if waiting == {joined}:
+                # Every tab has died, so nothing will ever drain the frontier.
+                joined.cancel()
+                errors = [task.exception() for task in workers if not task.cancelled()]
+                await records.put(RuntimeError(f"all {len(workers)} crawl tab(s) failed: {errors[0]!r}"))
+                return
+        await records.put(None)
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, concurrency))]
+    done = asyncio.create_task(finish())
+    try:
+        while (record := await records.get()) is not None:
+            if isinstance(record, Exception):
+                raise record
+            yield record
+    finally:
+        for task in workers + [done]:
+            task.cancel()
+        await asyncio.gather(*workers, done, return_exceptions=True)
+
+
+async def run_crawl(start_url, max_depth, concurrency, output_path):
+    async with async_playwright() as p:
+        # Launch a headless Chromium browser
+        browser = await p.chromium.launch(headless=True)
+        context = await browser.new_context()
+
+        # Stream every crawled page into the output sink
+        stats = {}
+        try:
+            with open_sink(output_path) as sink:
+                async for record in crawl_site(context, start_url, max_depth, concurrency, stats=stats):
+                    sink.write(record)
+            print(
+                f"\nCrawled {stats['crawled']} page(s) into {output_path}; {stats['skipped']} of "
+                f"{stats['discovered']} discovered URL(s) skipped (failed, throttled, disallowed or duplicate)."
+            )
+        finally:
+            await browser.close()
 
 
 def main():
@@ -79,19 +225,14 @@ def main():
     except ValueError:
         print("Invalid depth value. Using default depth of 2.")
         max_depth = 2
+    try:
+        concurrency = int(input("Enter number of parallel pages (e.g., 4): "))
+    except ValueError:
+        print("Invalid concurrency value. Using default of 4.")
+        concurrency = 4
+    output_path = input("Enter output file (.jsonl, .jsonl.gz or .sqlite): ").strip() or "crawl.jsonl"
 
-    visited = set()
-
-    with sync_playwright() as p:
-        # Launch a headless Chromium browser
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context()
-        page = context.new_page()
-
-        # Start crawling from the given URL
-        crawl_page(page, start_url, visited, max_depth, current_depth=0)
-
-        browser.close()
+    asyncio.run(run_crawl(start_url, max_depth, concurrency, output_path))
 
 
 if __name__ == "__main__":
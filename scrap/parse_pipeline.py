@@ -0,0 +1,110 @@
+# hands html parsing from the i/o threads to a process pool; parsed results come back
+# through a queue that the i/o threads drain, so handlers never run on pool threads.
+
+import concurrent.futures
+import multiprocessing
+import os
+import queue
+import threading
+
+
+class ParsePipeline:
+    """
+    Runs parse_fn(html) on a pool of `workers` processes (the CPU count by default).
+
+    submit() returns as soon as the html is queued. Finished parses are put on a
+    queue, and their handlers run in whichever I/O thread next calls submit() or
+    drain(), or in close(), so handlers must be thread-safe but never run on the
+    pool's own callback thread. handler(*args, parsed) gets the result; if parsing
+    raised, on_error(*args, exc) is called instead (or the error is logged). At most
+    max_pending parses are queued or running: once full, submit() blocks the I/O
+    thread until a parser frees up. workers=0 parses inline in the calling thread.
+    """
+
+    def __init__(self, parse_fn, workers=None, max_pending=None, log=print):
+        self.parse_fn = parse_fn
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_pending = max_pending or max(1, self.workers) * 4
+        self.log = log
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._done = queue.SimpleQueue()
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    @property
+    def pool(self):
+        # Created on first use: "spawn" children re-import the calling script, so a
+        # module-level pipeline must not start processes just by being constructed.
+        # "spawn" rather than fork, since the parent is full of I/O threads.
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def parse(self, html):
+        """Parses html and waits for the result."""
+        if not self.workers:
+            return self.parse_fn(html)
+        return self.pool.submit(self.parse_fn, html).result()
+
+    def submit(self, html, handler, *args, on_error=None):
+        """
+        Queues html for parsing; handler(*args, parsed) runs once it is parsed, or
+        on_error(*args, exc) if parsing fails.
+        """
+        if not self.workers:
+            try:
+                parsed = self.parse_fn(html)
+            except Exception as exc:
+                self._handle(handler, args, on_error, exc=exc)
+            else:
+                self._handle(handler, args, on_error, parsed=parsed)
+            return
+
+        self.drain()
+        self._slots.acquire()
+        try:
+            future = self.pool.submit(self.parse_fn, html)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        def done(future):
+            # Runs on the pool's management thread: only hand the result over.
+            self._done.put((future, handler, args, on_error))
+            self._slots.release()
+
+        future.add_done_callback(done)
+
+    def _handle(self, handler, args, on_error, parsed=None, exc=None):
+        try:
+            if exc is None:
+                handler(*args, parsed)
+            elif on_error is not None:
+                on_error(*args, exc)
+            else:
+                self.log(f"Parse failed for {args}: {exc!r}")
+        except Exception as handler_exc:
+            self.log(f"Parse handler failed for {args}: {handler_exc!r}")
+
+    def drain(self):
+        """Runs the handlers of every parse finished so far in the calling thread."""
+        while True:
+            try:
+                future, handler, args, on_error = self._done.get_nowait()
+            except queue.Empty:
+                return
+            exc = future.exception()
+            if exc is None:
+                self._handle(handler, args, on_error, parsed=future.result())
+            else:
+                self._handle(handler, args, on_error, exc=exc)
+
+    def close(self):
+        """Waits for queued parses, runs their handlers, then stops the pool."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+        self.drain()
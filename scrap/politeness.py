@@ -0,0 +1,200 @@
+# per-host politeness for the scrapers: a token bucket per host, robots.txt rules and
+# crawl-delay, and automatic slowdown when a server answers 429/503 or sends Retry-After.
+# Safe to share between threads and asyncio tasks.
+
+import asyncio
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+import requests
+
+THROTTLE_STATUSES = {429, 503}
+
+
+def parse_retry_after(value):
+    """Returns the Retry-After header as seconds from now, or None if absent/invalid."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class _Bucket:
+    def __init__(self, rate, burst):
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = burst
+        # Ceiling from the robots.txt crawl-delay; set_rate() never goes above it.
+        self.max_rate = float("inf")
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+
+class HostScheduler:
+    """
+    Paces requests per host. Each host gets `rate` requests per second with bursts
+    of up to `burst`, lowered to the robots.txt crawl-delay when one is set. A 429
+    or 503 halves the host's rate (down to min_rate) and honours Retry-After;
+    successful responses bring it back up gradually.
+    """
+
+    def __init__(
+        self,
+        rate=2.0,
+        burst=2,
+        min_rate=0.1,
+        user_agent="*",
+        respect_robots=True,
+        robots_ttl=24 * 3600,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.user_agent = user_agent
+        self.respect_robots = respect_robots
+        self.robots_ttl = robots_ttl
+        self._buckets = {}
+        self._robots = {}
+        self._lock = threading.Lock()
+        # One lock per origin, so a slow robots.txt only holds up requests to its own host.
+        self._robots_locks = {}
+
+    # robots.txt
+
+    def _fresh_robots(self, origin):
+        """The cached robots.txt parser for origin, or None if missing or older than robots_ttl."""
+        cached = self._robots.get(origin)
+        if cached is not None and time.monotonic() - cached[1] < self.robots_ttl:
+            return cached[0]
+        return None
+
+    def _robots_for(self, url):
+        parsed = urlparse(url)
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+        parser = self._fresh_robots(origin)
+        if parser is not None:
+            return parser
+
+        with self._lock:
+            robots_lock = self._robots_locks.setdefault(origin, threading.Lock())
+        with robots_lock:
+            parser = self._fresh_robots(origin)
+            if parser is not None:
+                return parser
+
+            parser = RobotFileParser(f"{origin}/robots.txt")
+            try:
+                response = requests.get(parser.url, timeout=10)
+                if response.status_code in (401, 403):
+                    parser.disallow_all = True
+                elif response.status_code >= 400:
+                    parser.allow_all = True
+                else:
+                    parser.parse(response.text.splitlines())
+            except requests.RequestException:
+                # Unreachable robots.txt: treat as no restrictions, like most crawlers.
+                parser.allow_all = True
+
+            self._robots[origin] = (parser, time.monotonic())
+
+            delay = parser.crawl_delay(self.user_agent)
+            if delay:
+                bucket = self._bucket(parsed.netloc)
+                with self._lock:
+                    bucket.max_rate = 1.0 / float(delay)
+                    bucket.base_rate = min(bucket.base_rate, bucket.max_rate)
+                    bucket.rate = min(bucket.rate, bucket.base_rate)
+                    bucket.burst = 1
+            return parser
+
+    def allowed(self, url):
+        """True if robots.txt lets user_agent fetch url (fetches and caches robots.txt)."""
+        if not self.respect_robots:
+            return True
+        return self._robots_for(url).can_fetch(self.user_agent, url)
+
+    async def allowed_async(self, url):
+        """allowed() that fetches a missing or expired robots.txt off the event loop."""
+        if not self.respect_robots:
+            return True
+        parsed = urlparse(url)
+        parser = self._fresh_robots(f"{parsed.scheme}://{parsed.netloc}")
+        if parser is not None:
+            return parser.can_fetch(self.user_agent, url)
+        return await asyncio.to_thread(self.allowed, url)
+
+    # pacing
+
+    def _bucket(self, host):
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets.setdefault(host, _Bucket(self.rate, self.burst))
+        return bucket
+
+    def _reserve(self, url):
+        """Takes a token for url's host and returns how long the caller must wait first."""
+        bucket = self._bucket(urlparse(url).netloc)
+        with self._lock:
+            now = time.monotonic()
+            bucket.tokens = min(bucket.burst, bucket.tokens + (now - bucket.updated) * bucket.rate)
+            bucket.updated = now
+            bucket.tokens -= 1
+            # A negative balance is a queue of callers; each waits for its own token.
+            delay = -bucket.tokens / bucket.rate if bucket.tokens < 0 else 0.0
+            return max(delay, bucket.blocked_until - now)
+
+    def wait(self, url):
+        """Blocks the calling thread until a request to url's host may be sent."""
+        delay = self._reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def wait_async(self, url):
+        delay = self._reserve(url)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def set_rate(self, url, rate, burst=None):
+        """
+        Changes the target rate (and burst) of url's host, e.g. to follow a concurrency
+        controller. The robots.txt crawl-delay still caps it; a host slowed down by
+        throttling climbs back towards the new rate gradually.
+        """
+        bucket = self._bucket(urlparse(url).netloc)
+        with self._lock:
+            throttled = bucket.rate < bucket.base_rate
+            bucket.base_rate = max(self.min_rate, min(rate, bucket.max_rate))
+            bucket.rate = min(bucket.rate, bucket.base_rate) if throttled else bucket.base_rate
+            if burst is not None and bucket.max_rate == float("inf"):
+                bucket.burst = burst
+
+    def record(self, url, status, retry_after=None):
+        """
+        Feeds a response back into the host's pacing. Returns True if the server
+        throttled us (429/503), in which case the request is worth retrying.
+        """
+        bucket = self._bucket(urlparse(url).netloc)
+        with self._lock:
+            if status in THROTTLE_STATUSES:
+                bucket.rate = max(self.min_rate, bucket.rate / 2)
+                bucket.tokens = min(bucket.tokens, 0.0)
+                pause = parse_retry_after(retry_after)
+                if pause is None:
+                    pause = 1.0 / bucket.rate
+                bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + pause)
+                return True
+            if bucket.rate < bucket.base_rate:
+                bucket.rate = min(bucket.base_rate, bucket.rate * 1.1)
+            return False
+
+    def current_rate(self, url):
+        return self._bucket(urlparse(url).netloc).rate
@@ -0,0 +1,56 @@
+# adaptive page-readiness for the playwright crawlers: a page is done once its visible
+# text stops changing for a short window, instead of waiting for a networkidle that
+# long-polling and chat widgets never let happen.
+
+# Polls a cheap signature of the rendered text and resolves with the signal that ended
+# the wait: "text_stable" after quietMs without changes, or "hard_cap" after maxMs.
+READY_JS = """
+async ({quietMs, maxMs, pollMs}) => {
+    const start = performance.now();
+    let last = null;
+    let lastChange = start;
+    while (true) {
+        const now = performance.now();
+        const body = document.body;
+        const sig = body ? body.innerText.length + ":" + body.getElementsByTagName("*").length : "";
+        if (sig !== last) {
+            last = sig;
+            lastChange = now;
+        } else if (sig && now - lastChange >= quietMs) {
+            return {signal: "text_stable", elapsed_ms: Math.round(now - start)};
+        }
+        if (now - start >= maxMs) {
+            return {signal: "hard_cap", elapsed_ms: Math.round(now - start)};
+        }
+        await new Promise(resolve => setTimeout(resolve, pollMs));
+    }
+}
+"""
+
+QUIET_MS = 750
+MAX_MS = 10000
+POLL_MS = 150
+
+
+def _args(quiet_ms, max_ms):
+    return {"quietMs": quiet_ms, "maxMs": max_ms, "pollMs": POLL_MS}
+
+
+def wait_until_ready(page, quiet_ms=QUIET_MS, max_ms=MAX_MS):
+    """
+    Blocks a playwright.sync_api page until its text is stable or max_ms passes.
+    Returns {"signal": ..., "elapsed_ms": ...}; the signal is "error" if the page
+    navigated away or closed while waiting.
+    """
+    try:
+        return page.evaluate(READY_JS, _args(quiet_ms, max_ms))
+    except Exception as e:
+        return {"signal": "error", "elapsed_ms": None, "error": str(e)}
+
+
+async def async_wait_until_ready(page, quiet_ms=QUIET_MS, max_ms=MAX_MS):
+    """Same as wait_until_ready, for a playwright.async_api page."""
+    try:
+        return await page.evaluate(READY_JS, _args(quiet_ms, max_ms))
+    except Exception as e:
+        return {"signal": "error", "elapsed_ms": None, "error": str(e)}
@@ -0,0 +1,145 @@
+# request interception for the playwright crawlers: abort the requests we never use
+# (media, fonts, trackers, chat widgets) so pages load faster and use less bandwidth.
+
+from urllib.parse import urlparse
+
+# Third-party analytics, ad and widget hosts. Matched on the host or any parent domain.
+TRACKER_HOSTS = {
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googleadservices.com",
+    "googlesyndication.com",
+    "doubleclick.net",
+    "facebook.net",
+    "connect.facebook.net",
+    "snap.licdn.com",
+    "ads.linkedin.com",
+    "hotjar.com",
+    "clarity.ms",
+    "hs-scripts.com",
+    "hs-analytics.net",
+    "hsforms.net",
+    "segment.com",
+    "segment.io",
+    "mixpanel.com",
+    "intercom.io",
+    "intercomcdn.com",
+    "tawk.to",
+    "zdassets.com",
+    "zopim.com",
+    "crisp.chat",
+    "drift.com",
+    "livechatinc.com",
+    "youtube.com",
+    "ytimg.com",
+    "vimeo.com",
+}
+
+MEDIA_TYPES = {"image", "media", "font"}
+
+PROFILES = {
+    "none": {"types": set(), "hosts": set()},
+    # Block by resource type only.
+    "resource_types": {"types": MEDIA_TYPES, "hosts": set()},
+    # Block known third-party hosts only.
+    "third_party_hosts": {"types": set(), "hosts": TRACKER_HOSTS},
+    # Keep only what can affect page text: documents, scripts and their data requests.
+    "text_only": {
+        "types": MEDIA_TYPES | {"stylesheet", "texttrack", "eventsource", "websocket", "manifest", "other"},
+        "hosts": TRACKER_HOSTS,
+    },
+}
+
+# Rough transfer sizes used to estimate what a blocked request would have cost.
+ESTIMATED_BYTES = {
+    "image": 60_000,
+    "media": 500_000,
+    "font": 40_000,
+    "stylesheet": 30_000,
+    "script": 80_000,
+}
+DEFAULT_ESTIMATED_BYTES = 10_000
+
+
+class ResourceBlocker:
+    """
+    Aborts requests matching a blocking profile and keeps per-page counters.
+
+    One blocker is attached to one tab; call take_stats() after each navigation to get
+    that page's numbers and reset the counters for the next one.
+    """
+
+    def __init__(self, profile="text_only", block_types=None, block_hosts=None):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown blocking profile {profile!r}, expected one of {sorted(PROFILES)}")
+        self.profile = profile
+        self.block_types = set(PROFILES[profile]["types"]) | set(block_types or ())
+        self.block_hosts = set(PROFILES[profile]["hosts"]) | set(block_hosts or ())
+        self._reset()
+
+    def _reset(self):
+        self.stats = {
+            "requests_loaded": 0,
+            "requests_blocked": 0,
+            "bytes_loaded": 0,
+            "est_bytes_saved": 0,
+        }
+
+    def _blocked_host(self, url):
+        host = urlparse(url).hostname or ""
+        parts = host.split(".")
+        return any(".".join(parts[i:]) in self.block_hosts for i in range(len(parts) - 1))
+
+    def should_block(self, url, resource_type):
+        if resource_type == "document":
+            return False
+        return resource_type in self.block_types or self._blocked_host(url)
+
+    def _record_block(self, resource_type):
+        self.stats["requests_blocked"] += 1
+        self.stats["est_bytes_saved"] += ESTIMATED_BYTES.get(resource_type, DEFAULT_ESTIMATED_BYTES)
+
+    def _on_response(self, response):
+        self.stats["requests_loaded"] += 1
+        try:
+            self.stats["bytes_loaded"] += int(response.headers.get("content-length", 0))
+        except ValueError:
+            pass
+
+    def _handle_sync(self, route):
+        request = route.request
+        if self.should_block(request.url, request.resource_type):
+            self._record_block(request.resource_type)
+            route.abort()
+        else:
+            route.continue_()
+
+    async def _handle_async(self, route):
+        request = route.request
+        if self.should_block(request.url, request.resource_type):
+            self._record_block(request.resource_type)
+            await route.abort()
+        else:
+            await route.continue_()
+
+    def attach_sync(self, page):
+        """Installs the route handler on a playwright.sync_api page."""
+        page.route("**/*", self._handle_sync)
+        page.on("response", self._on_response)
+
+    async def attach_async(self, page):
+        """Installs the route handler on a playwright.async_api page."""
+        await page.route("**/*", self._handle_async)
+        page.on("response", self._on_response)
+
+    def take_stats(self):
+        stats = self.stats
+        self._reset()
+        return stats
+
+
+def format_stats(stats):
+    return (
+        f"blocked {stats['requests_blocked']} request(s), ~{stats['est_bytes_saved'] // 1024} KB saved; "
+        f"loaded {stats['requests_loaded']} request(s), {stats['bytes_loaded'] // 1024} KB"
+    )
@@ -1,9 +1,18 @@
+import argparse
 import concurrent.futures
 import json
+import re
 import threading
+import time
+from urllib.parse import urlparse
 
-import requests
 from bs4 import BeautifulSoup
+from concurrency import AIMDController
+from http_client import PooledTransport
+from job_store import JobStore
+from listing_parser import parse_product_list
+from parse_pipeline import ParsePipeline
+from politeness import HostScheduler
 
 # Define the lists of values
 solution_categories = [
@@ -62,14 +71,61 @@ oems = [
 # A lock to synchronize printing from multiple threads.
 print_lock = threading.Lock()
 
+# Shared per-host pacing for all worker threads (requests per second, burst size). The
+# p2pconnect.in rate follows the AIMD window below rather than staying at this value.
+scheduler = HostScheduler(rate=5.0, burst=5)
+API_URL = "https://p2pconnect.in/Home/fetch_data/"
+# Requests per second each in-flight slot may send to the API host, so that pacing
+# only caps a runaway window and the controller is what sets throughput.
+RATE_PER_SLOT = 2.0
+# How many times a throttled (429/503) request is retried after slowing down.
+MAX_THROTTLE_RETRIES = 3
+# Whether the site's CodeIgniter pagination numbers its links by page rather than row offset.
+PAGINATION_USES_PAGE_NUMBERS = False
+# The row offset (or page number) CodeIgniter puts at the end of a pagination href.
+PAGINATION_VALUE_RE = re.compile(r"(\d+)/?$")
 
-def parse_product_list(html_content):
-    """
-    Uses BeautifulSoup to parse the HTML snippet in the 'product_list'
-    field and returns the cleaned text.
-    """
-    soup = BeautifulSoup(html_content, "html.parser")
-    return soup.get_text(separator="\n", strip=True)
+# Keep-alive sessions shared by the worker threads, one per thread.
+transport = PooledTransport(pool_size=10, timeout=(5, 30), retries=3, backoff_factor=0.5)
+
+
+def log(message):
+    with print_lock:
+        print(message)
+
+
+def pace_api(limit):
+    scheduler.set_rate(API_URL, limit * RATE_PER_SLOT, burst=limit)
+
+
+# Requests in flight are sized by AIMD between these bounds instead of a fixed pool.
+controller = AIMDController(initial=2, min_limit=1, max_limit=32, log=log, on_limit=pace_api)
+
+# Extra threads for fetching the remaining pages of a combination at once.
+prefetch_pool = concurrent.futures.ThreadPoolExecutor(max_workers=controller.max_limit)
+
+# Listing HTML is parsed in worker processes, one per CPU, fed by the I/O threads.
+parse_pipeline = ParsePipeline(parse_product_list, log=log)
+
+# Keys of listings already collected; the same listing shows up under many filters.
+seen_listings = set()
+seen_lock = threading.Lock()
+
+
+def describe(value):
+    """Short label for a filter value; multi-valued filters print as their size."""
+    if isinstance(value, (list, tuple)):
+        return value[0] if len(value) == 1 else f"{len(value)} values"
+    return value
+
+
+def claim_listing(key):
+    """Returns True the first time a listing key is seen across all threads."""
+    with seen_lock:
+        if key in seen_listings:
+            return False
+        seen_listings.add(key)
+        return True
 
 
 def get_api_data(page, location, category, oem):
@@ -77,7 +133,7 @@ def get_api_data(page, location, category, oem):
     Sends a POST request to the API endpoint for the given page number and parameters.
     Returns the parsed JSON response if successful or None if an error occurs.
     """
-    url = f"https://p2pconnect.in/Home/fetch_data/{page}"
+    url = f"{API_URL}{page}"
     payload = {
         "action": "fetch_data",
         "location[]": location,
@@ -85,15 +141,42 @@ def get_api_data(page, location, category, oem):
         "oem[]": oem,
     }
     headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    label = f"{describe(category)} | {describe(location)} | {describe(oem)}"
 
-    try:
-        response = requests.post(url, data=payload, headers=headers)
-    except Exception as e:
+    if not scheduler.allowed(url):
+        with print_lock:
+            print(f"robots.txt disallows {url}, skipping {label}.")
+        return None
+
+    for _ in range(MAX_THROTTLE_RETRIES + 1):
+        # Wait for this host's next free slot before sending.
+        scheduler.wait(url)
+        started = controller.acquire()
+        try:
+            response = transport.post(url, data=payload, headers=headers)
+        except Exception as e:
+            controller.release(started, overloaded=True)
+            with print_lock:
+                print(
+                    f"Request error on page {page} for {label}: {e}"
+                )
+            return None
+        controller.release(
+            started,
+            error=response.status_code != 200,
+            overloaded=response.status_code == 429 or response.status_code >= 500,
+        )
+
+        throttled = scheduler.record(
+            url, response.status_code, response.headers.get("Retry-After")
+        )
+        if not throttled:
+            break
         with print_lock:
             print(
-                f"Request error on page {page} for {category} | {location} | {oem}: {e}"
+                f"Throttled ({response.status_code}) on page {page} for {label}, "
+                f"slowing to {scheduler.current_rate(url):.2f} req/s"
             )
-        return None
 
     if response.status_code == 200:
         try:
@@ -101,72 +184,293 @@ def get_api_data(page, location, category, oem):
         except json.JSONDecodeError as e:
             with print_lock:
                 print(
-                    f"JSON decode error on page {page} for {category} | {location} | {oem}: {e}"
+                    f"JSON decode error on page {page} for {label}: {e}"
                 )
             return None
     else:
         with print_lock:
             print(
-                f"Request failed on page {page} for {category} | {location} | {oem}. Status code: {response.status_code}"
+                f"Request failed on page {page} for {label}. Status code: {response.status_code}"
             )
         return None
 
 
-def process_combination(category, location, oem):
+def pagination_value(anchor):
+    """The row offset (or page number) a pagination link points at, or None."""
+    value = anchor.get("data-ci-pagination-page", "")
+    if value.isdigit():
+        return int(value)
+    match = PAGINATION_VALUE_RE.search(urlparse(anchor.get("href", "")).path)
+    return int(match.group(1)) if match else None
+
+
+def last_page_number(pagination_html, use_page_numbers=PAGINATION_USES_PAGE_NUMBERS):
+    """
+    Returns the last page number of the listing from its pagination HTML, or None
+    when it only offers a "next" link and the page count is unknown.
+
+    CodeIgniter shows only a window of numbered links ("1 2 3 › Last"), so the
+    count comes from the highest link target, the "Last" link's. Its hrefs and
+    data-ci-pagination-page hold row offsets (/20, /200) unless use_page_numbers
+    is on; an offset is turned into a page with the per-page step read from a
+    numbered link (the page-2 link's offset). Without link targets, or without a
+    numbered link to take the step from, the highest page number shown is used.
+    """
+    soup = BeautifulSoup(pagination_html, "html.parser")
+    numbered, values = [], []
+    for anchor in soup.find_all("a"):
+        value = pagination_value(anchor)
+        if value is not None:
+            values.append(value)
+        text = anchor.get_text(strip=True)
+        if text.isdigit():
+            numbered.append((int(text), value))
+
+    # The current page is plain text (<strong>3</strong>), not a link.
+    pages = [int(text) for text in soup.stripped_strings if text.isdigit()]
+    steps = sorted((number, value // (number - 1)) for number, value in numbered if number > 1 and value)
+    if values and use_page_numbers:
+        pages.append(max(values))
+    elif values and steps:
+        pages.append(max(values) // steps[0][1] + 1)
+    return max(pages) if pages else None
+
+
+def handle_listings(combo, page, has_next, store, listings):
+    """
+    Claims, prints and checkpoints the parsed listings of one page. Called from
+    the parse pipeline once the page has been parsed.
+    """
+    category, location, oem = combo
+    new_listings = [listing for listing in listings if claim_listing(listing["key"])]
+    if new_listings:
+        with print_lock:
+            print(f"\n=== {category} | {location} | {oem} | Page {page} ===")
+            for listing in new_listings:
+                print(f"{listing['vendor']} | {listing['product']} | {listing['oem']} | {listing['location']}")
+    elif listings:
+        with print_lock:
+            print(
+                f"[{category} | {location} | {oem}] All {len(listings)} listing(s) on page {page} already seen."
+            )
+    else:
+        with print_lock:
+            print(
+                f"[{category} | {location} | {oem}] No product content found on page {page}."
+            )
+
+    if store:
+        # Every listing on the page, so listings seen before still gain this combination.
+        store.mark_done(combo, page, has_next, listings)
+
+
+def handle_parse_error(combo, page, has_next, store, exc):
+    """Logs a page whose HTML could not be parsed and marks it failed, so a resumed run retries it."""
+    category, location, oem = combo
+    log(f"[{category} | {location} | {oem}] Parsing page {page} failed: {exc!r}")
+    if store:
+        store.mark_failed(combo, page, f"parse error: {exc!r}")
+
+
+def process_page(combo, page, data, store=None):
+    """
+    Queues one fetched page's product HTML on the parse pipeline and returns
+    (pagination_html, has_next) straight away, so the I/O thread can move on
+    to the next request while the page is parsed in another process.
+    """
+    # Check if there is a "next" page using the pagination HTML
+    pagination_html = data.get("pagination_link", "")
+    has_next = 'rel="next"' in pagination_html
+    parse_pipeline.submit(
+        data.get("product_list", ""),
+        handle_listings,
+        combo,
+        page,
+        has_next,
+        store,
+        on_error=handle_parse_error,
+    )
+    return pagination_html, has_next
+
+
+def fetch_pages(combo, pages, store=None):
+    """
+    Fetches several pages of a combination concurrently on the prefetch pool,
+    as many at a time as the shared controller allows, and queues them for
+    parsing in page order. Stops at the first page with no product HTML, in
+    case the pagination promised more pages than exist.
+
+    Returns (has_next, ended): has_next of the last page processed, and whether
+    an empty page ended the combination early.
+    """
+    category, location, oem = combo
+    has_next = False
+    start = 0
+    while start < len(pages):
+        batch = pages[start : start + max(1, controller.limit)]
+        start += len(batch)
+        for page in batch:
+            if store:
+                store.mark_pending(combo, page)
+        fetched = list(
+            prefetch_pool.map(lambda page: get_api_data(page, location, category, oem), batch)
+        )
+
+        for i, (page, data) in enumerate(zip(batch, fetched)):
+            if not data:
+                if store:
+                    store.mark_failed(combo, page, "no data returned or request error")
+                with print_lock:
+                    print(f"[{category} | {location} | {oem}] No data returned or error on page {page}.")
+                has_next = False
+                continue
+            if not data.get("product_list", "").strip():
+                # Past the real last page: this and the rest of the batch hold nothing.
+                if store:
+                    for empty_page in batch[i:]:
+                        store.mark_done(combo, empty_page, False, [])
+                with print_lock:
+                    print(f"[{category} | {location} | {oem}] Page {page} is empty; stopping here.")
+                return False, True
+            _, has_next = process_page(combo, page, data, store)
+    return has_next, False
+
+
+def process_combination(category, location, oem, store=None):
     """
     For a given combination of solution category, location, and OEM,
     iterates through all paginated results, scrapes and prints the extracted content.
+    Once the pagination shows the last page number, the remaining pages are
+    fetched concurrently; otherwise pages are followed one "next" link at a time.
+    With a job store, pages finished by an earlier run are skipped and every
+    page is recorded as pending, done or failed.
     """
+    combo = (category, location, oem)
     page = 1
-    results = []  # You can optionally collect the results here.
+    pages_fetched = 0
     while True:
+        state = store.page_status(combo, page) if store else None
+        if state is not None and state[0] == "done":
+            if not state[1]:
+                break
+            page += 1
+            continue
+        if store:
+            store.mark_pending(combo, page)
+
         data = get_api_data(page, location, category, oem)
         if not data:
+            if store:
+                store.mark_failed(combo, page, "no data returned or request error")
             with print_lock:
                 print(
                     f"[{category} | {location} | {oem}] No data returned or error on page {page}. Moving on."
                 )
             break
 
-        product_html = data.get("product_list", "")
-        if product_html:
-            product_text = parse_product_list(product_html)
-            with print_lock:
-                print(f"\n=== {category} | {location} | {oem} | Page {page} ===")
-                print(product_text)
-            results.append(product_text)
-        else:
-            with print_lock:
-                print(
-                    f"[{category} | {location} | {oem}] No product content found on page {page}."
-                )
+        pagination_html, has_next = process_page(combo, page, data, store)
+        pages_fetched += 1
 
-        # Check if there is a "next" page using the pagination HTML
-        pagination_html = data.get("pagination_link", "")
-        if 'rel="next"' in pagination_html:
+        last_page = last_page_number(pagination_html) if has_next else None
+        if last_page is not None and last_page > page + 1:
+            pages = [
+                p
+                for p in range(page + 1, last_page + 1)
+                if not (store and (store.page_status(combo, p) or ("",))[0] == "done")
+            ]
+            has_next, ended = fetch_pages(combo, pages, store)
+            pages_fetched += len(pages)
+            if ended:
+                break
+            if store and (not pages or pages[-1] != last_page):
+                # The last page was finished by an earlier run.
+                has_next = store.page_status(combo, last_page)[1]
+            # Keep walking sequentially if more pages appeared past the known last one.
+            page = last_page
+        if has_next:
             page += 1
         else:
             with print_lock:
                 print(f"[{category} | {location} | {oem}] Finished pagination.")
             break
-    return results
+    return pages_fetched
+
+
+def probe(category, location, oem, store=None):
+    """
+    Fetches the first page for a filter whose facets may be multi-valued and
+    reports whether it can contain listings. A failed request counts as
+    non-empty so errors never prune coverage. Outcomes are remembered in the
+    job store so a resumed sweep does not probe again.
+    """
+    key = tuple("|".join(v) if isinstance(v, (list, tuple)) else v for v in (category, location, oem))
+    found = store.probe_result(key) if store else None
+    if found is not None:
+        return found
+
+    data = get_api_data(1, location, category, oem)
+    if data is None:
+        return True
+    found = bool(parse_pipeline.parse(data.get("product_list", "")))
+    if store:
+        store.record_probe(key, found)
+    return found
 
 
 def main():
-    # Build all combinations of (solution_category, country, oem)
-    combinations = [
-        (category, country, oem)
-        for category in solution_categories
-        for country in countries
-        for oem in oems
-    ]
-
-    # Adjust max_workers based on your system and network bandwidth.
-    max_workers = 10
+    parser = argparse.ArgumentParser(description="Sweep p2pconnect.in listings.")
+    parser.add_argument("--db", default="sweep.sqlite", help="job ledger and results database")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--resume",
+        action="store_true",
+        help="skip work finished by a previous run in --db (the default)",
+    )
+    mode.add_argument(
+        "--fresh",
+        action="store_true",
+        help="delete every job, probe and listing in --db and start a new sweep",
+    )
+    args = parser.parse_args()
+
+    store = JobStore(args.db, reset=args.fresh)
+    seen_listings.update(store.listing_keys())
+    if store.summary():
+        print(f"Resuming: {store.summary()} job(s), {len(seen_listings)} listing(s) already stored.")
+
+    # Threads only bound the pool; the controller decides how many requests run at once.
+    max_workers = controller.max_limit
     with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Sweep the filter space top-down and only descend below filters that
+        # returned listings: category, then category × country, then the full
+        # (category, country, oem) combinations that get paginated.
+        live_categories = [
+            category
+            for category, found in zip(
+                solution_categories,
+                executor.map(lambda cat: probe(cat, countries, oems, store), solution_categories),
+            )
+            if found
+        ]
+        pairs = [(category, country) for category in live_categories for country in countries]
+        live_pairs = [
+            pair
+            for pair, found in zip(
+                pairs, executor.map(lambda pair: probe(pair[0], pair[1], oems, store), pairs)
+            )
+            if found
+        ]
+        combinations = [(category, country, oem) for (category, country) in live_pairs for oem in oems]
+        total = len(solution_categories) * len(countries) * len(oems)
+        with print_lock:
+            print(
+                f"Probed {len(solution_categories) + len(pairs)} coarse filter(s); "
+                f"crawling {len(combinations)} of {total} combinations."
+            )
+
         # Submit a task for each combination
         future_to_combo = {
-            executor.submit(process_combination, cat, loc, oem): (cat, loc, oem)
+            executor.submit(process_combination, cat, loc, oem, store): (cat, loc, oem)
             for (cat, loc, oem) in combinations
         }
 
@@ -174,12 +478,27 @@ def main():
         for future in concurrent.futures.as_completed(future_to_combo):
             combo = future_to_combo[future]
             try:
-                # Each future returns the list of results (if needed)
+                # Each future returns the number of pages fetched
                 _ = future.result()
             except Exception as exc:
                 with print_lock:
                     print(f"Combination {combo} generated an exception: {exc}")
 
+    # Let queued parses finish and run their handlers before closing the ledger.
+    parse_pipeline.close()
+    store.close()
+    print(
+        "Concurrency over time: "
+        + ", ".join(f"{time.strftime('%H:%M:%S', time.localtime(t))}={n}" for t, n in controller.history)
+    )
+    print(f"Collected {len(seen_listings)} unique listing(s) into {args.db}.")
+    stats = transport.connection_stats()
+    print(
+        f"HTTP: {stats['requests']} request(s) over {stats['connections']} connection(s) "
+        f"in {stats['sessions']} session(s), {stats['reused']} reused."
+    )
+    transport.close()
+
 
 if __name__ == "__main__":
     main()
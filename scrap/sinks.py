@@ -0,0 +1,115 @@
+# record sinks for crawler output: pages are streamed to disk as they are crawled, with a
+# small bounded buffer, instead of being printed or held in memory.
+
+import gzip
+import json
+import sqlite3
+
+
+class JsonlSink:
+    """Writes one JSON object per line, flushing every `buffer_size` records."""
+
+    def __init__(self, path, buffer_size=100):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.buffer = []
+        self.count = 0
+        self._file = self._open(path)
+
+    def _open(self, path):
+        return open(path, "a", encoding="utf-8")
+
+    def write(self, record):
+        self.buffer.append(json.dumps(record, ensure_ascii=False) + "\n")
+        self.count += 1
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self._file.writelines(self.buffer)
+            self._file.flush()
+            self.buffer = []
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class GzipJsonlSink(JsonlSink):
+    """JSONL compressed with gzip; appending adds a new gzip member, which readers handle."""
+
+    def _open(self, path):
+        return gzip.open(path, "at", encoding="utf-8")
+
+
+class SqliteSink:
+    """
+    Stores records in a `pages` table keyed by url. Well-known fields get their own
+    columns; everything else is kept as JSON in `extra`.
+    """
+
+    COLUMNS = ("url", "depth", "text", "links")
+
+    def __init__(self, path, buffer_size=100):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.buffer = []
+        self.count = 0
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                depth INTEGER,
+                text TEXT,
+                links TEXT,
+                extra TEXT
+            )"""
+        )
+        self._db.commit()
+
+    def write(self, record):
+        extra = {k: v for k, v in record.items() if k not in self.COLUMNS}
+        self.buffer.append(
+            (
+                record.get("url"),
+                record.get("depth"),
+                record.get("text"),
+                json.dumps(record.get("links", [])),
+                json.dumps(extra),
+            )
+        )
+        self.count += 1
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            with self._db:
+                self._db.executemany("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)", self.buffer)
+            self.buffer = []
+
+    def close(self):
+        self.flush()
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_sink(path, buffer_size=100):
+    """Picks a sink from the file extension: .jsonl.gz, .sqlite/.db, otherwise JSONL."""
+    if path.endswith(".gz"):
+        return GzipJsonlSink(path, buffer_size)
+    if path.endswith((".sqlite", ".sqlite3", ".db")):
+        return SqliteSink(path, buffer_size)
+    return JsonlSink(path, buffer_size)
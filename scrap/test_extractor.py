@@ -0,0 +1,17 @@
+from extractor import extract_internal_links
+
+
+def test_same_site_links_match_in_canonical_form():
+    hrefs = [
+        "https://Example.com:443/x",
+        "HTTPS://EXAMPLE.COM/y/",
+        "/z",
+        "https://example.com:8443/other-port",
+        "https://other.com/q",
+        "http://[::1",
+    ]
+    assert sorted(extract_internal_links("https://example.com/a", hrefs)) == [
+        "https://example.com/x",
+        "https://example.com/y",
+        "https://example.com/z",
+    ]
@@ -0,0 +1,37 @@
+import pytest
+from listing_parser import parse_product_list
+
+
+def parse_card(html):
+    (listing,) = parse_product_list(html)
+    return listing
+
+
+@pytest.mark.parametrize(
+    "html, expected",
+    [
+        (
+            "<div><h4>Acme</h4><p><strong>Location:</strong> India</p></div>",
+            {"vendor": "Acme", "product": "", "location": "India"},
+        ),
+        (
+            "<div><h4>Acme</h4><h5>Cloud ERP</h5><p><strong>OEM:</strong> SAP</p></div>",
+            {"vendor": "Acme", "product": "Cloud ERP", "oem": "SAP"},
+        ),
+        (
+            "<div><strong>OEM</strong><br><strong>SAP</strong><h4>Acme</h4></div>",
+            {"vendor": "Acme", "product": "", "oem": "SAP"},
+        ),
+        (
+            "<div><strong>Vendor - Acme</strong><strong>Location -</strong><p>Pune</p><h4>Payroll</h4></div>",
+            {"vendor": "Acme", "product": "Payroll", "location": "Pune"},
+        ),
+        (
+            "<div><h4>Acme - Cloud ERP</h4><p>Location: India</p></div>",
+            {"vendor": "Acme - Cloud ERP", "location": "India"},
+        ),
+    ],
+)
+def test_labelled_strong_headings_are_not_names(html, expected):
+    listing = parse_card(html)
+    assert {field: listing[field] for field in expected} == expected
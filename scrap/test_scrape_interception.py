@@ -0,0 +1,30 @@
+import pytest
+from scrape_interception import last_page_number
+
+BASE = "https://p2pconnect.in/Home/fetch_data/"
+
+
+def link(text, value):
+    return f'<a href="{BASE}{value}" data-ci-pagination-page="{value}">{text}</a>'
+
+
+@pytest.mark.parametrize(
+    "html, last_page",
+    [
+        # Page 1 of 11 at 20 rows a page: only pages 2-3 are numbered links.
+        ("<strong>1</strong>" + link("2", 20) + link("3", 40) + link("&rsaquo;", 20) + link("Last &rsaquo;", 200), 11),
+        (link("3", 40) + link("4", 60) + "<strong>5</strong>" + link("6", 100) + link("Last", 200), 11),
+        # Offsets only in the href.
+        (f'<strong>1</strong><a href="{BASE}20">2</a><a href="{BASE}60">Last</a>', 4),
+        # No targets to read: the highest page shown.
+        ('<strong>1</strong><a href="#">2</a><a href="#">3</a>', 3),
+        ('<a href="#" rel="next">Next</a>', None),
+    ],
+)
+def test_last_page_number(html, last_page):
+    assert last_page_number(html) == last_page
+
+
+def test_last_page_number_with_page_numbers():
+    html = "<strong>1</strong>" + link("2", 2) + link("3", 3) + link("Last", 11)
+    assert last_page_number(html, use_page_numbers=True) == 11